@@ -0,0 +1,193 @@
+"""
+Writes subjects directly to an Anki deck package (.apkg), ready to import, with
+no TSV step. An .apkg is a zip archive holding an SQLite collection in Anki's
+schema version 11 and a JSON map of media files. Each subject type gets its own
+note type whose fields follow that type's anki_schema().
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import zipfile
+
+from interface.subjects import Radical, Kanji, Vocabulary
+
+# Anki's field separator within a note's flds column.
+_FIELD_SEPARATOR = '\x1f'
+
+# Stable IDs so re-importing a package updates the same deck and note types.
+DECK_ID = 1565000000000
+_MODEL_IDS = {Radical: 1565000000001, Kanji: 1565000000002,
+              Vocabulary: 1565000000003}
+# Note and card IDs are offset subject IDs, so they are stable as well.
+_NOTE_ID_BASE = 1565000000000000
+_CARD_ID_BASE = 1566000000000000
+
+_SCHEMA = '''
+CREATE TABLE col (id integer primary key, crt integer not null,
+  mod integer not null, scm integer not null, ver integer not null,
+  dty integer not null, usn integer not null, ls integer not null,
+  conf text not null, models text not null, decks text not null,
+  dconf text not null, tags text not null);
+CREATE TABLE notes (id integer primary key, guid text not null,
+  mid integer not null, mod integer not null, usn integer not null,
+  tags text not null, flds text not null, sfld integer not null,
+  csum integer not null, flags integer not null, data text not null);
+CREATE TABLE cards (id integer primary key, nid integer not null,
+  did integer not null, ord integer not null, mod integer not null,
+  usn integer not null, type integer not null, queue integer not null,
+  due integer not null, ivl integer not null, factor integer not null,
+  reps integer not null, lapses integer not null, left integer not null,
+  odue integer not null, odid integer not null, flags integer not null,
+  data text not null);
+CREATE TABLE revlog (id integer primary key, cid integer not null,
+  usn integer not null, ease integer not null, ivl integer not null,
+  lastIvl integer not null, factor integer not null, time integer not null,
+  type integer not null);
+CREATE TABLE graves (usn integer not null, oid integer not null,
+  type integer not null);
+CREATE INDEX ix_notes_usn on notes (usn);
+CREATE INDEX ix_cards_usn on cards (usn);
+CREATE INDEX ix_revlog_usn on revlog (usn);
+CREATE INDEX ix_cards_nid on cards (nid);
+CREATE INDEX ix_cards_sched on cards (did, queue, due);
+CREATE INDEX ix_revlog_cid on revlog (cid);
+CREATE INDEX ix_notes_csum on notes (csum);
+'''
+
+_CSS = ('.card { font-family: arial; font-size: 20px; text-align: center; '
+        'color: black; background-color: white; }')
+
+
+def _escape(field):
+  """
+  @return (str) @p field as Anki note HTML.
+  """
+  return field.replace('\r\n', '<br>').replace('\n', '<br>')
+
+
+def _model(subject_class, now):
+  """
+  @return (dict) The Anki note type for @p subject_class.
+  """
+  fields = subject_class.anki_schema().split()
+  name = 'WaniKani {}'.format(subject_class.__name__)
+  back = '<br>'.join('{{{{{}}}}}'.format(field) for field in fields
+                     if field not in ('id', 'characters'))
+  return {
+    'id': _MODEL_IDS[subject_class],
+    'name': name,
+    'type': 0,
+    'mod': now,
+    'usn': -1,
+    'sortf': 0,
+    'did': DECK_ID,
+    'tmpls': [{
+      'name': 'Recognition',
+      'ord': 0,
+      # Fall back to the meanings for radicals without characters.
+      'qfmt': '{{#characters}}{{characters}}{{/characters}}'
+              '{{^characters}}{{meanings}}{{/characters}}',
+      'afmt': '{{FrontSide}}<hr id=answer>' + back,
+      'did': None,
+      'bqfmt': '',
+      'bafmt': '',
+    }],
+    'flds': [{'name': field, 'ord': index, 'sticky': False, 'rtl': False,
+              'font': 'Arial', 'size': 20, 'media': []}
+             for index, field in enumerate(fields)],
+    'css': _CSS,
+    'latexPre': '\\documentclass[12pt]{article}\n\\begin{document}\n',
+    'latexPost': '\\end{document}',
+    'tags': [],
+    'vers': [],
+    'req': [[0, 'any', [fields.index('characters'), fields.index('meanings')]]],
+  }
+
+
+def _collection(deck_name, now):
+  """
+  @return (tuple) The values of the single col row.
+  """
+  deck = {'id': DECK_ID, 'name': deck_name, 'desc': '', 'mod': now, 'usn': -1,
+          'collapsed': False, 'dyn': 0, 'conf': 1, 'extendNew': 10,
+          'extendRev': 50, 'newToday': [0, 0], 'revToday': [0, 0],
+          'lrnToday': [0, 0], 'timeToday': [0, 0]}
+  default = dict(deck, id=1, name='Default')
+  dconf = {'1': {
+    'id': 1, 'name': 'Default', 'mod': 0, 'usn': 0, 'maxTaken': 60,
+    'autoplay': True, 'timer': 0, 'replayq': True, 'dyn': False,
+    'new': {'delays': [1, 10], 'ints': [1, 4, 7], 'initialFactor': 2500,
+            'order': 1, 'perDay': 20, 'bury': True, 'separate': True},
+    'rev': {'perDay': 100, 'ease4': 1.3, 'fuzz': 0.05, 'maxIvl': 36500,
+            'ivlFct': 1, 'bury': True, 'minSpace': 1},
+    'lapse': {'delays': [10], 'mult': 0, 'minInt': 1, 'leechFails': 8,
+              'leechAction': 0}}}
+  conf = {'activeDecks': [1], 'curDeck': 1, 'newSpread': 0, 'collapseTime': 1200,
+          'timeLim': 0, 'estTimes': True, 'dueCounts': True, 'curModel': None,
+          'nextPos': 1, 'sortType': 'noteFld', 'sortBackwards': False,
+          'addToCur': True}
+  models = {str(model_id): _model(subject_class, now)
+            for subject_class, model_id in _MODEL_IDS.items()}
+  decks = {'1': default, str(DECK_ID): deck}
+  return (1, now, now * 1000, now * 1000, 11, 0, 0, 0, json.dumps(conf),
+          json.dumps(models), json.dumps(decks), json.dumps(dconf), '{}')
+
+
+def _checksum(field):
+  return int(hashlib.sha1(field.encode('utf-8')).hexdigest()[:8], 16)
+
+
+def write_apkg(path, subjects, deck_name='WaniKani', media=None):
+  """
+  Write @p subjects as one note and one new card each to an Anki package.
+
+  @p path (str) The .apkg file to write.
+  @p subjects (iterable) Radical, Kanji, and Vocabulary instances; streamed
+    into the collection, not held in memory.
+  @p deck_name (str) The name of the deck the cards are placed in.
+  @p media (dict of str to str) Media files to include, mapping the name
+    notes refer to to the file's path on disk. It is only read once every
+    subject is written, so it may be filled in as @p subjects is consumed.
+  @return (int) The number of notes written.
+  """
+  now = int(time.time())
+  media = media if media is not None else {}
+
+  with tempfile.TemporaryDirectory() as scratch:
+    collection = os.path.join(scratch, 'collection.anki2')
+    db = sqlite3.connect(collection)
+    db.executescript(_SCHEMA)
+    db.execute('INSERT INTO col VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)',
+               _collection(deck_name, now))
+
+    count = 0
+    for position, subject in enumerate(subjects):
+      fields = [_escape(field) for field in subject.anki_fields()]
+      note_id = _NOTE_ID_BASE + subject.id
+      db.execute('INSERT INTO notes VALUES (?,?,?,?,?,?,?,?,?,?,?)',
+                 (note_id, 'wktk{}'.format(subject.id),
+                  _MODEL_IDS[type(subject)], now, -1, '',
+                  _FIELD_SEPARATOR.join(fields), fields[0],
+                  _checksum(fields[0]), 0, ''))
+      db.execute('INSERT INTO cards VALUES '
+                 '(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)',
+                 (_CARD_ID_BASE + subject.id, note_id, DECK_ID, 0, now, -1,
+                  0, 0, position, 0, 0, 0, 0, 0, 0, 0, 0, ''))
+      count += 1
+
+    db.commit()
+    db.close()
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as package:
+      package.write(collection, 'collection.anki2')
+      names = {}
+      for index, (name, source) in enumerate(sorted(media.items())):
+        package.write(source, str(index))
+        names[str(index)] = name
+      package.writestr('media', json.dumps(names))
+
+  return count
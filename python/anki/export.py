@@ -0,0 +1,85 @@
+"""
+Writes subjects as Anki import files. Rows are built from each subject's
+anki_fields() and escaped a chunk at a time, then written through one buffered
+writer. Large exports can format their chunks in a
+process pool.
+"""
+
+from collections import deque
+from itertools import islice
+
+from interface.subjects import Subject
+
+# The number of subjects formatted per chunk.
+CHUNK_SIZE = 512
+
+# Rows and fields are first joined with ASCII control characters WaniKani
+# never uses, so a whole chunk can be escaped with a few C-level replace()
+# passes instead of per-row Python work, then given their real delimiters.
+_FIELD_MARK = '\x1f'
+_ROW_MARK = '\x1e'
+
+
+def format_tsv(subjects):
+  """
+  @p subjects (iterable) Radical, Kanji, and Vocabulary instances.
+  @return (str) One tab-separated line per subject. Line breaks within fields
+    become spaces, as in to_anki(), and so do tabs.
+  """
+  text = _ROW_MARK.join(_FIELD_MARK.join(subject.anki_fields())
+                        for subject in subjects)
+  if not text:
+    return ''
+  # Dropping '\r' first turns WaniKani's '\r\n' into the single space
+  # to_anki() produces.
+  text = text.replace('\r', '').replace('\n', ' ').replace(
+    Subject.ANKI_SEPARATOR, ' ')
+  return text.replace(_FIELD_MARK, Subject.ANKI_SEPARATOR).replace(
+    _ROW_MARK, '\n') + '\n'
+
+
+def chunks(iterable, size=CHUNK_SIZE):
+  """
+  @return A generator of lists of up to @p size items from @p iterable.
+  """
+  iterator = iter(iterable)
+  chunk = list(islice(iterator, size))
+  while chunk:
+    yield chunk
+    chunk = list(islice(iterator, size))
+
+
+def write_tsv(out, subjects, processes=1, chunk_size=CHUNK_SIZE):
+  """
+  Write @p subjects to @p out in Anki's tab-separated import format, in the
+  order given.
+
+  @p out A text file, ideally buffered.
+  @p subjects (iterable) Radical, Kanji, and Vocabulary instances.
+  @p processes (int) If greater than 1, chunks are formatted in a pool of this
+    many processes. At most two chunks per process are in flight, so memory
+    stays bounded for streamed input.
+  @p chunk_size (int) The number of subjects per chunk.
+  @return (int) The number of subjects written.
+  """
+  count = 0
+  if processes <= 1:
+    for chunk in chunks(subjects, chunk_size):
+      out.write(format_tsv(chunk))
+      count += len(chunk)
+    return count
+
+  # Imported here; starting a pool is rare and multiprocessing is slow to load.
+  from concurrent.futures import ProcessPoolExecutor
+
+  with ProcessPoolExecutor(max_workers=processes) as executor:
+    pending = deque()
+    for chunk in chunks(subjects, chunk_size):
+      pending.append(executor.submit(format_tsv, chunk))
+      count += len(chunk)
+      if len(pending) >= 2 * processes:
+        out.write(pending.popleft().result())
+    while pending:
+      out.write(pending.popleft().result())
+
+  return count
@@ -0,0 +1,77 @@
+"""
+Tracks which subjects an Anki export has already written so later exports can
+emit only what changed. The manifest is a JSON file mapping each exported
+subject's ID to its data_updated_at, type, and level.
+"""
+
+import json
+import os
+
+
+class ExportManifest:
+  def __init__(self, path):
+    """
+    Load the manifest at @p path; a missing file is an empty manifest.
+    """
+    self.path = path
+    self._entries = {}
+    self._seen = set()
+    if os.path.exists(path):
+      with open(path, encoding='utf-8') as manifest:
+        self._entries = {int(subject_id): tuple(entry) for subject_id, entry
+                         in json.load(manifest).items()}
+
+  def __len__(self):
+    return len(self._entries)
+
+  def changed(self, subjects):
+    """
+    Filter @p subjects down to those new since, or updated after, the last
+    export, recording every subject seen.
+
+    @p subjects (iterable) Radical, Kanji, and Vocabulary instances.
+    @return A generator of the new or updated subjects, in the order given.
+    """
+    for subject in subjects:
+      self._seen.add(subject.id)
+      entry = (subject.updated_at, type(subject).__name__.lower(),
+               subject.level)
+      if self._entries.get(subject.id) != entry:
+        self._entries[subject.id] = entry
+        yield subject
+
+  def removed(self, types=None, level=0):
+    """
+    Forget and return the subjects exported before but not seen by changed()
+    this time. Only subjects within the scope of this export are considered,
+    so exporting one level does not remove the others.
+
+    @p types (iterable of str) The subject types this export covered; None
+      for all.
+    @p level (int) The level this export covered; 0 for all.
+    @return (list of int) The removed subject IDs in ascending order.
+    """
+    types = set(types) if types else None
+    removed = sorted(
+      subject_id for subject_id, (_, subject_type, subject_level)
+      in self._entries.items()
+      if subject_id not in self._seen and
+        (types is None or subject_type in types) and
+        (level <= 0 or subject_level == level))
+    for subject_id in removed:
+      del self._entries[subject_id]
+    return removed
+
+  def save(self):
+    """
+    Write the manifest, replacing the previous file atomically.
+    """
+    directory = os.path.dirname(self.path)
+    if directory:
+      os.makedirs(directory, exist_ok=True)
+    temporary = self.path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as manifest:
+      json.dump({str(subject_id): entry for subject_id, entry
+                 in sorted(self._entries.items())}, manifest,
+                separators=(',', ':'))
+    os.replace(temporary, self.path)
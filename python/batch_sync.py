@@ -0,0 +1,136 @@
+#!/usr/bin/python3 -B
+"""
+Export WaniKani data for many users in one process. Tokens are read from the
+keyring once, every user's requests share one connection pool, and the subject
+catalog, which is the same for everyone, is fetched once rather than per user.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from identity import identity
+from interface.cache import SubjectCache
+from interface.interface import IncompleteCollection, Interface
+from interface.time import NO_TIME
+from session.session import Session, BASE_URL, create_http_session
+
+
+def handle_args():
+  """
+  @return the object returned by argparse.ArgumentParser.parse_args().
+  """
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--out-dir', help='the directory to write exports to',
+                      default='.')
+  parser.add_argument('--workers', help=('the number of users to sync '
+                      'concurrently'), type=int, default=4)
+  parser.add_argument('--cache-path', help=('read the subject catalog through '
+                      'this subject cache'))
+  parser.add_argument('users', help='the WaniKani usernames to export',
+                      nargs='+')
+  return parser.parse_args()
+
+
+def write_columns(path, columns):
+  """
+  Write a columns.Columns collection to @p path as CSV with a header row.
+  Timestamps are microseconds since the epoch; missing ones are left empty.
+  """
+  names = [field.name for field in columns.FIELDS]
+  with open(path, 'w', newline='') as out:
+    writer = csv.writer(out)
+    writer.writerow(names)
+    for row in zip(*(getattr(columns, name) for name in names)):
+      writer.writerow(['' if value == NO_TIME else value for value in row])
+
+
+def export_catalog(interface, path, cache_path):
+  """
+  Write every subject's JSON to @p path, one object per line.
+
+  @return (bool) True on success. On failure nothing is left at @p path.
+  """
+  cache = SubjectCache(cache_path) if cache_path else None
+  try:
+    with open(path, 'w', encoding='utf-8') as out:
+      for item in interface.iter_subject_json(cache=cache):
+        out.write(json.dumps(item))
+        out.write('\n')
+  except IncompleteCollection:
+    print('Could not fetch every subject; no catalog was written.')
+    os.remove(path)
+    return False
+  finally:
+    if cache is not None:
+      cache.close()
+  return True
+
+
+def export_user(user, token, http, out_dir):
+  """
+  Export one user's per-user collections to @p out_dir/@p user/.
+
+  @return (Interface) The user's interface, or None on error.
+  """
+  session = Session(token, http=http)
+  if not session:
+    print('Could not start a session for user {}.'.format(user))
+    return None
+
+  interface = Interface(session, BASE_URL)
+  user_dir = os.path.join(out_dir, user)
+  os.makedirs(user_dir, exist_ok=True)
+
+  for name, fetch in (('assignments', interface.get_assignments),
+                      ('review_statistics', interface.get_review_statistics)):
+    columns = fetch()
+    if columns is None:
+      print('Could not fetch {} for user {}.'.format(name, user))
+      return None
+    write_columns(os.path.join(user_dir, name + '.csv'), columns)
+
+  return interface
+
+
+def main():
+  args = handle_args()
+
+  # Each user is synced once, however often they are named.
+  users = list(dict.fromkeys(args.users))
+  for user in users:
+    if args.users.count(user) > 1:
+      print('User {} was given more than once; syncing once.'.format(user))
+
+  tokens = identity.get_api_keys(users)
+  if not tokens:
+    sys.exit(1)
+
+  os.makedirs(args.out_dir, exist_ok=True)
+  # Rate limits are per token, so users proceed independently; only the
+  # connections are shared.
+  http = create_http_session(pool_size=max(args.workers, 1))
+
+  with ThreadPoolExecutor(max_workers=args.workers) as executor:
+    futures = {user: executor.submit(export_user, user, token, http,
+                                     args.out_dir)
+               for user, token in tokens.items()}
+    interfaces = [future.result() for future in futures.values()]
+
+  interfaces = [interface for interface in interfaces if interface]
+  if not interfaces:
+    sys.exit(1)
+
+  exported = export_catalog(interfaces[0],
+                            os.path.join(args.out_dir, 'subjects.ndjson'),
+                            args.cache_path)
+
+  if not exported or len(interfaces) != len(users):
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
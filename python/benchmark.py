@@ -0,0 +1,606 @@
+#!/usr/bin/python3 -B
+"""
+Benchmarks for the toolkit, run against synthetic fixtures so that no API token
+or network access is needed. Run a benchmark by name; see --help.
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+
+from fixtures.catalog import synthetic_catalog
+from fixtures.server import StubServer
+from interface.jsonbackend import (available_backends, loads,
+                                   decode_subject_page, typed_subjects_available)
+from interface.lazy import lazy_subjects
+from interface.subjects import Subjects, Vocabulary, create_subject
+from interface.time import (TIME_FORMAT, wk_to_datetime, cached_wk_to_datetime,
+                            wk_to_datetime64)
+
+
+def measure_memory(build):
+  """
+  @p build (callable) Builds and returns the structure to measure.
+  @return (tuple of int) The bytes still allocated once @p build returns and
+    the peak bytes allocated while it ran.
+  """
+  gc.collect()
+  tracemalloc.start()
+  try:
+    result = build()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+  finally:
+    tracemalloc.stop()
+  del result
+  return current, peak
+
+
+def bench_memory(args):
+  """
+  Compare the resident size of the full catalog held as raw JSON dicts, as
+  slotted Subject instances (with and without their JSON), and as LazySubject
+  instances. Each representation is decoded from the same bytes so strings are
+  counted against it rather than shared with the fixture.
+  """
+  encoded = json.dumps(synthetic_catalog(seed=args.seed)).encode('utf-8')
+  print('Catalog: {:.1f} MB of JSON'.format(len(encoded) / 1e6))
+
+  def subjects(store_json):
+    def build():
+      built = Subjects([], [], [])
+      collections = {'radical': built.radicals, 'kanji': built.kanji,
+                     'vocabulary': built.vocabulary}
+      for item in json.loads(encoded.decode('utf-8')):
+        collections[item['object']].append(create_subject(item, store_json))
+      return built
+    return build
+
+  cases = (
+    ('raw dicts', lambda: json.loads(encoded.decode('utf-8'))),
+    ('subjects', subjects(False)),
+    ('subjects + JSON', subjects(True)),
+    ('lazy subjects', lambda: lazy_subjects(json.loads(
+      encoded.decode('utf-8')))),
+  )
+
+  print('{:<16} {:>12} {:>12}'.format('representation', 'retained MB',
+                                      'peak MB'))
+  for name, build in cases:
+    current, peak = measure_memory(build)
+    print('{:<16} {:>12.1f} {:>12.1f}'.format(name, current / 1e6,
+                                              peak / 1e6))
+
+
+def report_time(name, seconds, count):
+  """
+  Print one result line for a timing benchmark.
+  """
+  print('{:<28} {:>10.1f} ms {:>10.0f} ns/item'.format(
+    name, seconds * 1e3, seconds / count * 1e9))
+
+
+def bench_timestamps(args):
+  """
+  Compare timestamp parsing: the original strptime(), wk_to_datetime(), its
+  memoised variant, and the NumPy batch conversion.
+  """
+  catalog = synthetic_catalog(seed=args.seed)
+  # Assignment-like data repeats timestamps, so include each one twice.
+  times = [item['data_updated_at'] for item in catalog] * 2
+  count = len(times)
+
+  def best(function):
+    return min(timeit.repeat(function, number=1, repeat=args.repeat))
+
+  report_time('strptime', best(lambda: [
+    datetime.strptime(time, TIME_FORMAT) for time in times]), count)
+  report_time('wk_to_datetime', best(lambda: [
+    wk_to_datetime(time) for time in times]), count)
+
+  def cached():
+    cached_wk_to_datetime.cache_clear()
+    return [cached_wk_to_datetime(time) for time in times]
+  report_time('cached_wk_to_datetime (cold)', best(cached), count)
+
+  try:
+    report_time('wk_to_datetime64', best(lambda: wk_to_datetime64(times)),
+                count)
+  except ImportError:
+    print('wk_to_datetime64: skipped; NumPy is not installed')
+
+
+def bench_decode(args):
+  """
+  Compare decoding the catalog, as one page of the subjects collection, with
+  each installed JSON backend: the decode alone, and the decode plus building
+  Subject instances. With msgspec, decoding into typed structs is included.
+  Times are per 1,000 subjects.
+  """
+  catalog = synthetic_catalog(seed=args.seed)
+  encoded = json.dumps({'object': 'collection', 'pages': {'next_url': None},
+                        'data': catalog}).encode('utf-8')
+  count = len(catalog)
+  print('Page: {:.1f} MB of JSON, {} subjects'.format(len(encoded) / 1e6,
+                                                      count))
+
+  def best(function):
+    return min(timeit.repeat(function, number=1, repeat=args.repeat))
+
+  def construct(decode):
+    return lambda: [create_subject(item)
+                    for item in decode(encoded)['data']]
+
+  decoders = [(backend, lambda data, backend=backend: loads(data, backend))
+              for backend in available_backends()]
+  if typed_subjects_available():
+    decoders.append(('msgspec structs', decode_subject_page))
+
+  print('{:<16} {:>16} {:>16}'.format('backend', 'decode ms/1k',
+                                      '+ subjects ms/1k'))
+  for name, decode in decoders:
+    decoded = best(lambda: decode(encoded))
+    constructed = best(construct(decode))
+    print('{:<16} {:>16.2f} {:>16.2f}'.format(name, decoded / count * 1e6,
+                                              constructed / count * 1e6))
+
+
+def bench_sync(args):
+  """
+  Fetch the catalog end to end from a local fixtures.server stand-in, through
+  Session and Interface: sequentially, with concurrent workers, and into an
+  empty and an up-to-date cache. Reports the best wall time, the throughput in
+  subjects and wire bytes, and, from a separate traced run, the peak memory.
+  """
+  # Imported here so the other benchmarks run without requests installed.
+  from interface.cache import SubjectCache
+  from interface.instrument import Instrumentation
+  from interface.interface import Interface
+  from interface.ratelimit import TokenBucket
+  from session.session import Session, create_http_session
+
+  catalog = synthetic_catalog(seed=args.seed)
+  directory = tempfile.mkdtemp()
+  cache_path = os.path.join(directory, 'subjects.sqlite')
+
+  def fetch(server, workers=1, cache=None):
+    instrumentation = Instrumentation()
+    session = Session('benchmark', http=create_http_session(),
+                      instrumentation=instrumentation,
+                      base_url=server.base_url)
+    # Throttling would dominate the timings; 429s still pause the bucket.
+    interface = Interface(session, server.base_url,
+                          rate_limiter=TokenBucket(capacity=1000, window=1.0),
+                          instrumentation=instrumentation)
+    subjects = interface.get_subjects(workers=workers, cache=cache)
+    session.http().close()
+    return subjects, instrumentation
+
+  def cold_cache():
+    if os.path.exists(cache_path):
+      os.remove(cache_path)
+    return SubjectCache(cache_path)
+
+  cases = (
+    ('sequential', lambda server: fetch(server), None),
+    ('4 workers', lambda server: fetch(server, workers=4), None),
+    ('cache, cold', lambda server: fetch(server, cache=cache), cold_cache),
+    ('cache, warm', lambda server: fetch(server, cache=cache), None),
+  )
+
+  print('{} subjects, {} per page, {:.0f} ms latency, 429 every {}'.format(
+    len(catalog), args.per_page, args.latency,
+    args.rate_limit_every if args.rate_limit_every else 'never'))
+  print('{:<12} {:>8} {:>10} {:>8} {:>10} {:>9}'.format(
+    'case', 'requests', 'best ms', 'MB/s', 'subjects/s', 'peak MB'))
+
+  with StubServer(catalog, per_page=args.per_page,
+                  latency=args.latency / 1e3,
+                  rate_limit_every=args.rate_limit_every) as server:
+    cache = None
+    for name, run, setup in cases:
+      times = []
+      for _ in range(args.repeat):
+        if setup is not None:
+          if cache is not None:
+            cache.close()
+          cache = setup()
+        start = time.perf_counter()
+        subjects, instrumentation = run(server)
+        times.append(time.perf_counter() - start)
+
+      if setup is not None:
+        cache.close()
+        cache = setup()
+      _, peak = measure_memory(lambda: run(server))
+
+      count = sum(len(collection) for collection in subjects)
+      received = sum(record.bytes for record in instrumentation.records)
+      best = min(times)
+      print('{:<12} {:>8} {:>10.1f} {:>8.1f} {:>10.0f} {:>9.1f}'.format(
+        name, len(instrumentation.records), best * 1e3,
+        received / best / 1e6, count / best, peak / 1e6))
+
+    cache.close()
+
+  os.remove(cache_path)
+  os.rmdir(directory)
+
+
+def bench_startup(args):
+  """
+  Measure how long get_subjects.py takes to start, using a run that needs no
+  network: the best wall time of --anki-schema, and the modules it imports
+  that take longest, from python -X importtime.
+  """
+  script = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'get_subjects.py')
+  command = [sys.executable, script, '--anki-schema']
+
+  def best(function):
+    return min(timeit.repeat(function, number=1, repeat=args.repeat))
+
+  baseline = best(lambda: subprocess.run([sys.executable, '-c', 'pass'],
+                                         check=True))
+  total = best(lambda: subprocess.run(command, stdout=subprocess.DEVNULL,
+                                      check=True))
+  print('Interpreter alone: {:.1f} ms'.format(baseline * 1e3))
+  print('get_subjects.py --anki-schema: {:.1f} ms'.format(total * 1e3))
+
+  report = subprocess.run([sys.executable, '-X', 'importtime'] + command[1:],
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True).stderr
+  imports = []
+  for line in report.splitlines():
+    # import time: self [us] | cumulative | imported package
+    fields = line.split('|')
+    if len(fields) != 3 or not fields[1].strip().isdigit():
+      continue
+    name = fields[2].rstrip()
+    # Only modules imported directly, not those they pull in.
+    if not name.startswith('  '):
+      imports.append((int(fields[1]), name.strip()))
+
+  print('{:<32} {:>12}'.format('slowest top-level imports', 'cumulative ms'))
+  for cumulative, name in sorted(imports, reverse=True)[:10]:
+    print('{:<32} {:>12.1f}'.format(name, cumulative / 1e3))
+
+
+def bench_images(args):
+  """
+  Fetch the images of every image-only radical from a local fixtures.server
+  stand-in into an empty asset cache, then again into the now warm cache,
+  with --latency applied to each download.
+  """
+  # Imported here so the other benchmarks run without requests installed.
+  from interface.assets import AssetCache, fetch_assets
+  from interface.instrument import Instrumentation
+  from interface.subjects import Radical
+  from session.session import create_http_session
+
+  catalog = synthetic_catalog(seed=args.seed)
+  directory = tempfile.mkdtemp()
+
+  with StubServer(catalog, latency=args.latency / 1e3) as server:
+    radicals = [Radical(item, False) for item in server.catalog
+                if item['object'] == 'radical']
+    urls = [radical.image_url for radical in radicals
+            if not radical.characters and radical.image_url]
+    print('{} image-only radicals of {}; {:.0f} ms latency'.format(
+      len(urls), len(radicals), args.latency))
+    print('{:<8} {:>8} {:>10}'.format('cache', 'requests', 'ms'))
+
+    http = create_http_session()
+    cache = AssetCache(directory)
+    for name in ('cold', 'warm'):
+      instrumentation = Instrumentation()
+      start = time.perf_counter()
+      fetch_assets(cache, urls, http, instrumentation=instrumentation)
+      elapsed = time.perf_counter() - start
+      print('{:<8} {:>8} {:>10.1f}'.format(name, len(instrumentation.records),
+                                           elapsed * 1e3))
+    http.close()
+
+  for name in os.listdir(directory):
+    os.remove(os.path.join(directory, name))
+  os.rmdir(directory)
+
+
+def bench_search(args):
+  """
+  Build the full-text search index over the catalog, save and load it, and
+  time queries against the loaded index: an exact meaning, a misspelt one, a
+  mnemonic word, and Japanese from a context sentence.
+  """
+  from interface.search import SearchIndex
+
+  subjects = [create_subject(item) for item in synthetic_catalog(
+    seed=args.seed)]
+  vocabulary = [subject for subject in subjects
+                if isinstance(subject, Vocabulary)]
+  word = vocabulary[0].meanings[0].split()[0]
+  typo = word[1] + word[0] + word[2:]
+
+  def best(function):
+    return min(timeit.repeat(function, number=1, repeat=args.repeat))
+
+  build = best(lambda: SearchIndex(subjects))
+  index = SearchIndex(subjects)
+  handle, path = tempfile.mkstemp(suffix='.json')
+  os.close(handle)
+  try:
+    save = best(lambda: index.save(path))
+    size = os.path.getsize(path)
+    load = best(lambda: SearchIndex.load(path))
+    loaded = SearchIndex.load(path)
+  finally:
+    os.remove(path)
+
+  print('Build: {:.0f} ms; save: {:.0f} ms, {:.1f} MB; load: {:.0f} ms'.format(
+    build * 1e3, save * 1e3, size / 1e6, load * 1e3))
+  print('{:<32} {:>8} {:>10}'.format('query', 'results', 'ms'))
+  queries = (
+    ('meaning', vocabulary[0].meanings[0], None),
+    ('misspelt meaning', typo, None),
+    ('mnemonic word', word, ('meaning_mnemonic', 'reading_mnemonic')),
+    ('sentence Japanese', vocabulary[0].sentences[0].ja[:4], ('sentences',)),
+  )
+  for name, query, fields in queries:
+    seconds = best(lambda: loaded.search(query, fields=fields))
+    print('{:<32} {:>8} {:>10.2f}'.format(
+      '{} ({})'.format(name, query), len(loaded.search(query, fields=fields)),
+      seconds * 1e3))
+
+
+def bench_planner(args):
+  """
+  Time the lesson planner for a synthetic user on level 30 with every earlier
+  level passed: loading their assignments and planning all 60 levels, then
+  replanning after one assignment changes, and with nothing changed.
+  """
+  from interface.columns import Assignments
+  from interface.planner import LessonPlanner
+  from interface.store import SubjectStore
+  from interface.subjects import Radical
+
+  level = 30
+  store = SubjectStore(create_subject(item) for item in synthetic_catalog(
+    seed=args.seed))
+  now = datetime(2026, 1, 1, 12)
+  review = (now + timedelta(hours=3)).strftime(TIME_FORMAT)
+
+  assignments = Assignments()
+  for subject in store:
+    if subject.level < level:
+      stage = 5
+    elif subject.level == level and isinstance(subject, Radical):
+      # Half of the level's radicals are in reviews, half await lessons.
+      stage = 4 if subject.id % 2 else 0
+    else:
+      continue
+    assignments.append({'id': subject.id, 'data': {
+      'subject_id': subject.id,
+      'subject_type': type(subject).__name__.lower(),
+      'srs_stage': stage,
+      'available_at': review if stage else None,
+    }})
+  changed = next(subject_id for subject_id, stage in zip(
+    assignments.subject_id, assignments.srs_stage) if stage == 0)
+
+  def cold():
+    planner = LessonPlanner(store)
+    planner.update(assignments)
+    return planner.plans(now)
+
+  planner = LessonPlanner(store)
+  planner.update(assignments)
+  planner.plans(now)
+
+  def incremental():
+    planner.set_progress(changed, 1)
+    planner.set_progress(changed, 0)
+    return planner.plans(now)
+
+  plan = planner.plan(level, now)
+  print('{} assignments; level {} levels up at {}, {} lessons, {} '
+        'critical'.format(len(assignments), level, plan.level_up_at,
+                          len(plan.lessons), len(plan.critical)))
+  print('{:<32} {:>10}'.format('all 60 levels', 'ms'))
+  for name, function in (('cold', cold), ('after one update', incremental),
+                         ('unchanged', lambda: planner.plans(now))):
+    seconds = min(timeit.repeat(function, number=1, repeat=args.repeat))
+    print('{:<32} {:>10.2f}'.format(name, seconds * 1e3))
+
+
+def bench_readings(args):
+  """
+  Report the memory held by the reading index over the catalog, against a
+  plain dict of reading to ID list, and time exact, prefix, and romaji prefix
+  queries against it.
+  """
+  from interface.readings import ReadingIndex, to_key
+  from interface.store import subject_readings
+
+  subjects = [create_subject(item) for item in synthetic_catalog(
+    seed=args.seed)]
+
+  def plain():
+    readings = {}
+    for subject in subjects:
+      for reading in subject_readings(subject):
+        readings.setdefault(to_key(reading), []).append(subject.id)
+    return readings
+
+  index = ReadingIndex(subjects)
+  print('{} distinct readings'.format(len(index)))
+  print('{:<16} {:>12} {:>12}'.format('structure', 'retained KB', 'peak KB'))
+  for name, build in (('ReadingIndex', lambda: ReadingIndex(subjects)),
+                      ('dict of lists', plain)):
+    current, peak = measure_memory(build)
+    print('{:<16} {:>12.0f} {:>12.0f}'.format(name, current / 1e3, peak / 1e3))
+
+  reading = index.completions('', 1)[0]
+  queries = (
+    ('lookup', lambda: index.lookup(reading)),
+    ('prefix (kana)', lambda: index.prefix(reading[:2])),
+    ('prefix (romaji)', lambda: index.prefix('shou')),
+    ('prefix (partial)', lambda: index.prefix('ky')),
+    ('completions', lambda: index.completions(reading[:2], 10)),
+  )
+  number = 1000
+  print('{:<16} {:>8} {:>10}'.format('query', 'results', 'us'))
+  for name, query in queries:
+    seconds = min(timeit.repeat(query, number=number, repeat=args.repeat))
+    print('{:<16} {:>8} {:>10.1f}'.format(name, len(query()),
+                                         seconds / number * 1e6))
+
+
+def bench_similar(args):
+  """
+  Time the all-pairs top 10 of the similar-kanji index over every kanji, and
+  over every kanji and vocabulary, against scoring a sample of kanji with
+  nested Python loops over component sets, extrapolated to all kanji.
+  """
+  from interface.similar import SimilarityIndex
+  from interface.subjects import Kanji
+
+  subjects = [create_subject(item) for item in synthetic_catalog(
+    seed=args.seed)]
+  kanji = [subject for subject in subjects if isinstance(subject, Kanji)]
+
+  def best(function):
+    return min(timeit.repeat(function, number=1, repeat=args.repeat))
+
+  build = best(lambda: SimilarityIndex(subjects))
+  index = SimilarityIndex(subjects)
+  print('{} kanji, {} indexed; build: {:.0f} ms'.format(len(kanji), len(index),
+                                                       build * 1e3))
+
+  components = [set(subject.component_ids) for subject in kanji]
+  sample = components[:args.sample]
+
+  def nested():
+    for query in sample:
+      scores = [len(query & other) / len(query | other)
+                for other in components if query | other]
+      sorted(scores, reverse=True)[:10]
+
+  kanji_ids = [subject.id for subject in kanji]
+  print('{:<32} {:>10}'.format('all-pairs top 10', 'ms'))
+  for name, seconds in (
+      ('kanji, nested loops (estimated)',
+       best(nested) * len(kanji) / len(sample)),
+      ('kanji, index', best(lambda: index.neighbours(kanji_ids))),
+      ('kanji and vocabulary, index', best(lambda: index.neighbours()))):
+    print('{:<32} {:>10.0f}'.format(name, seconds * 1e3))
+
+
+def bench_snapshot(args):
+  """
+  Compare loading the catalog from a snapshot against decoding it from JSON
+  and building every subject: the time to open each and answer a lookup by ID
+  and by characters, the time for a cold process to do the same, and the size
+  of each file.
+  """
+  from interface.snapshot import Snapshot, write_snapshot
+
+  catalog = synthetic_catalog(seed=args.seed)
+  directory = tempfile.mkdtemp()
+  json_path = os.path.join(directory, 'catalog.json')
+  snapshot_path = os.path.join(directory, 'catalog.snapshot')
+  with open(json_path, 'w', encoding='utf-8') as out:
+    json.dump(catalog, out)
+  write_snapshot(snapshot_path, catalog)
+  target = catalog[len(catalog) // 2]
+  characters = target['data']['characters']
+
+  def from_json():
+    with open(json_path, 'rb') as source:
+      subjects = {}
+      for item in loads(source.read()):
+        subject = create_subject(item)
+        subjects[subject.id] = subject
+    found = [subject for subject in subjects.values()
+             if subject.characters == characters]
+    return subjects[target['id']], found
+
+  def from_snapshot():
+    with Snapshot(snapshot_path) as snapshot:
+      return snapshot.get(target['id']), snapshot.by_characters(characters)
+
+  def best(function):
+    return min(timeit.repeat(function, number=1, repeat=args.repeat))
+
+  python = os.path.dirname(os.path.abspath(__file__))
+  cold = {
+    'JSON': ('import json\n'
+             'from interface.subjects import create_subject\n'
+             'with open({!r}) as source:\n'
+             '  subjects = [create_subject(item) for item in json.load(source)]'
+             .format(json_path)),
+    'snapshot': ('from interface.snapshot import Snapshot\n'
+                 'Snapshot({!r}).get({})'.format(snapshot_path, target['id'])),
+  }
+
+  print('{} subjects'.format(len(catalog)))
+  print('{:<10} {:>8} {:>14} {:>10}'.format('format', 'MB', 'in-process ms',
+                                            'cold ms'))
+  for name, path, load in (('JSON', json_path, from_json),
+                           ('snapshot', snapshot_path, from_snapshot)):
+    seconds = best(load)
+    process = best(lambda: subprocess.run([sys.executable, '-c', cold[name]],
+                                          cwd=python, check=True))
+    print('{:<10} {:>8.1f} {:>14.1f} {:>10.1f}'.format(
+      name, os.path.getsize(path) / 1e6, seconds * 1e3, process * 1e3))
+
+  for name in os.listdir(directory):
+    os.remove(os.path.join(directory, name))
+  os.rmdir(directory)
+
+
+BENCHMARKS = {
+  'decode': bench_decode,
+  'images': bench_images,
+  'readings': bench_readings,
+  'search': bench_search,
+  'similar': bench_similar,
+  'snapshot': bench_snapshot,
+  'memory': bench_memory,
+  'planner': bench_planner,
+  'startup': bench_startup,
+  'sync': bench_sync,
+  'timestamps': bench_timestamps,
+}
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('benchmark', help='the benchmark to run',
+                      choices=sorted(BENCHMARKS))
+  parser.add_argument('--seed', help='the synthetic fixture seed', type=int,
+                      default=0)
+  parser.add_argument('--repeat', help=('timing benchmarks report the best of '
+                      'this many runs'), type=int, default=5)
+  parser.add_argument('--per-page', help='sync: subjects per page', type=int,
+                      default=1000)
+  parser.add_argument('--latency', help=('sync: milliseconds the server waits '
+                      'before each response'), type=float, default=0.0)
+  parser.add_argument('--rate-limit-every', help=('sync: the server answers '
+                      'every Nth request with a 429'), type=int, default=0)
+  parser.add_argument('--sample', help=('similar: the number of kanji '
+                      'scored with nested loops'), type=int, default=100)
+  args = parser.parse_args()
+
+  BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,222 @@
+"""
+Generates a synthetic subject catalog shaped like the WaniKani V2 subjects
+collection, for exercising and benchmarking the toolkit without an API token.
+The catalog is deterministic for a given seed. Its sizes, field lengths, and
+component relationships approximate the real catalog, but its content is
+meaningless.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+# Approximate sizes of the real catalog.
+RADICALS = 500
+KANJI = 2100
+VOCABULARY = 6700
+LEVELS = 60
+
+# The first codepoint handed out to synthetic kanji.
+KANJI_BASE = 0x4e00
+
+_SYLLABLES = ('か', 'き', 'く', 'け', 'こ', 'さ', 'し', 'す', 'せ',
+              'そ', 'た', 'ち', 'つ', 'て', 'と', 'な', 'に', 'ぬ',
+              'ね', 'の', 'は', 'ひ', 'ふ', 'へ', 'ほ', 'ま', 'み',
+              'む', 'め', 'も', 'や', 'ゆ', 'よ', 'ら', 'り', 'る',
+              'れ', 'ろ', 'わ', 'ん', 'が', 'ぎ', 'ぐ', 'げ', 'ご',
+              'じ', 'ず', 'だ', 'ば', 'び', 'ぶ', 'ぽ', 'しょう',
+              'きょ', 'ちゅう', 'りょ', 'い', 'う', 'え', 'お',
+              'あ')
+_WORDS = ('ground', 'fire', 'water', 'tree', 'person', 'mouth', 'big', 'small',
+          'mountain', 'river', 'sun', 'moon', 'power', 'stop', 'rice',
+          'field', 'heart', 'eye', 'hand', 'foot', 'gold', 'king', 'jewel',
+          'thread', 'insect', 'shell', 'sword', 'cliff', 'roof', 'private',
+          'spoon', 'world', 'ceiling', 'stool', 'net', 'table', 'nose',
+          'treasure', 'leader', 'cloud', 'rain', 'wind', 'stone', 'horse')
+_PARTS_OF_SPEECH = ('noun', 'suru verb', 'godan verb', 'ichidan verb',
+                    'i adjective', 'na adjective', 'adverb', 'numeral')
+_EPOCH = datetime(2017, 7, 10)
+
+
+def synthetic_catalog(radicals=RADICALS, kanji=KANJI, vocabulary=VOCABULARY,
+                      seed=0):
+  """
+  @p radicals (int) The number of radicals to generate.
+  @p kanji (int) The number of kanji to generate.
+  @p vocabulary (int) The number of vocabulary to generate.
+  @p seed The random seed; equal seeds give equal catalogs.
+  @return (list of dict) Subject JSON objects in subject ID order. Within each
+    level, radicals precede kanji, which precede vocabulary, as in WaniKani.
+  """
+  rng = random.Random(seed)
+  generator = _Generator(rng)
+
+  for level in range(1, LEVELS + 1):
+    for _ in range(_share(radicals, level)):
+      generator.radical(level)
+    for _ in range(_share(kanji, level)):
+      generator.kanji(level)
+    for _ in range(_share(vocabulary, level)):
+      generator.vocabulary(level)
+
+  return generator.items
+
+
+def _share(total, level):
+  """
+  @return (int) How many of @p total subjects are placed on @p level, spread
+    evenly over all levels.
+  """
+  return total * level // LEVELS - total * (level - 1) // LEVELS
+
+
+def _timestamp(moment):
+  return moment.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+class _Generator:
+  def __init__(self, rng):
+    self._rng = rng
+    self.items = []
+    self._radicals = []  # (subject ID, level)
+    self._kanji = []  # (subject ID, level, characters, readings)
+    self._by_id = {}
+
+  def radical(self, level):
+    rng = self._rng
+    image_only = rng.random() < 0.1
+    item = self._subject('radical', level, '<radical>',
+                         rng.choice(_WORDS).title())
+    data = item['data']
+    data['characters'] = (None if image_only else
+                          chr(0x2e80 + len(self._radicals) % 0x100))
+    data['character_images'] = [{
+      'url': 'https://files.wanikani.com/{:x}.svg'.format(
+        rng.getrandbits(64)),
+      'metadata': {'inline_styles': True},
+      'content_type': 'image/svg+xml'}]
+    self._radicals.append((item['id'], level))
+
+  def kanji(self, level):
+    rng = self._rng
+    characters = chr(KANJI_BASE + len(self._kanji))
+    item = self._subject('kanji', level, '<kanji>', rng.choice(_WORDS))
+    data = item['data']
+    data['characters'] = characters
+
+    readings = []
+    for reading_type, count in (('onyomi', rng.randint(1, 2)),
+                                ('kunyomi', rng.randint(0, 2)),
+                                ('nanori', rng.randint(0, 1))):
+      for _ in range(count):
+        readings.append({'type': reading_type,
+                         'primary': not readings,
+                         'reading': self._kana(rng.randint(1, 3)),
+                         'accepted_answer': reading_type == 'onyomi'})
+    data['readings'] = readings
+    data['reading_mnemonic'] = self._mnemonic('<reading>')
+    data['reading_hint'] = self._mnemonic('<ja>')
+
+    components = self._pick(self._radicals, level, rng.randint(1, 4))
+    data['component_subject_ids'] = components
+    data['visually_similar_subject_ids'] = [
+      kanji[0] for kanji in self._pick_rows(self._kanji, level,
+                                            rng.randint(0, 3))]
+    self._link(item, components)
+    self._kanji.append((item['id'], level, characters, readings))
+
+  def vocabulary(self, level):
+    rng = self._rng
+    parts = self._pick_rows(self._kanji, level, rng.randint(1, 3))
+    characters = ''.join(part[2] for part in parts)
+    reading = ''.join(part[3][0]['reading'] for part in parts)
+    if rng.random() < 0.3:
+      okurigana = self._kana(1)
+      characters += okurigana
+      reading += okurigana
+
+    item = self._subject('vocabulary', level, '<vocabulary>',
+                         ' '.join(rng.choice(_WORDS)
+                                  for _ in range(rng.randint(1, 3))))
+    data = item['data']
+    data['characters'] = characters
+    data['readings'] = [{'primary': True, 'reading': reading,
+                         'accepted_answer': True}]
+    data['parts_of_speech'] = rng.sample(_PARTS_OF_SPEECH, rng.randint(1, 2))
+    data['reading_mnemonic'] = self._mnemonic('<reading>')
+    data['context_sentences'] = [
+      {'en': ' '.join(rng.choice(_WORDS)
+                      for _ in range(rng.randint(4, 12))).capitalize() + '.' +
+             ('\n' if rng.random() < 0.2 else ''),
+       'ja': characters + self._kana(rng.randint(4, 16)) + '。'}
+      for _ in range(rng.randint(2, 3))]
+    data['pronunciation_audios'] = [{
+      'url': 'https://files.wanikani.com/{:x}.mp3'.format(
+        rng.getrandbits(64)),
+      'content_type': 'audio/mpeg',
+      'metadata': {'gender': 'female', 'pronunciation': reading}}]
+
+    components = [part[0] for part in parts]
+    data['component_subject_ids'] = components
+    self._link(item, components)
+
+  def _subject(self, subject_type, level, tag, meaning):
+    rng = self._rng
+    subject_id = len(self.items) + 1
+    created = _EPOCH + timedelta(seconds=rng.randrange(10 ** 8))
+    updated = created + timedelta(seconds=rng.randrange(10 ** 7),
+                                  microseconds=rng.randrange(10 ** 6))
+    item = {
+      'id': subject_id,
+      'object': subject_type,
+      'url': 'https://api.wanikani.com/v2/subjects/{}'.format(subject_id),
+      'data_updated_at': _timestamp(updated),
+      'data': {
+        'created_at': _timestamp(created),
+        'level': level,
+        'slug': meaning.lower().replace(' ', '-'),
+        'hidden_at': None,
+        'document_url': 'https://www.wanikani.com/{}/{}'.format(
+          subject_type, subject_id),
+        'meanings': [{'meaning': meaning, 'primary': True,
+                      'accepted_answer': True}],
+        'auxiliary_meanings': [
+          {'meaning': rng.choice(_WORDS), 'type': 'whitelist'}
+          for _ in range(rng.randint(0, 2))],
+        'amalgamation_subject_ids': [],
+        'meaning_mnemonic': self._mnemonic(tag),
+        'lesson_position': len(self.items) % 100,
+        'spaced_repetition_system_id': 2 if level > 2 else 1,
+      }
+    }
+    self.items.append(item)
+    self._by_id[subject_id] = item
+    return item
+
+  def _link(self, item, components):
+    for component in components:
+      self._by_id[component]['data']['amalgamation_subject_ids'].append(
+        item['id'])
+
+  def _pick(self, rows, level, count):
+    return [row[0] for row in self._pick_rows(rows, level, count)]
+
+  def _pick_rows(self, rows, level, count):
+    """
+    @return Up to @p count distinct rows, preferring those from @p level.
+    """
+    if not rows:
+      return []
+    candidates = [row for row in rows[-40:] if row[1] == level] or rows[-40:]
+    return self._rng.sample(candidates, min(count, len(candidates)))
+
+  def _kana(self, syllables):
+    return ''.join(self._rng.choice(_SYLLABLES) for _ in range(syllables))
+
+  def _mnemonic(self, tag):
+    rng = self._rng
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(40, 90))]
+    words[rng.randrange(len(words))] = '{}{}</{}'.format(
+      tag, rng.choice(_WORDS), tag[1:])
+    if rng.random() < 0.5:
+      words.append('\r\n\r\n' + ' '.join(words[:10]))
+    return ' '.join(words).capitalize() + '.'
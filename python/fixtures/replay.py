@@ -0,0 +1,139 @@
+"""
+Record and replay HTTP traffic, so that a session against the real API can be
+captured once and then rerun offline, repeatably and without a token. Both are
+transport adapters, mounted on a requests.Session, so everything above the
+transport (Session, Interface, instrumentation) runs unchanged.
+
+A cassette is a JSON file mapping 'METHOD /path?query' to the responses
+received for it, in order. The host is left out of the key, so a cassette
+recorded against a fixtures.server stand-in replays whatever port it ran on.
+Request headers, and so API tokens, are never written. Replaying a URL returns
+its responses in the order they were recorded; once they are exhausted, the
+last one is repeated.
+"""
+
+import base64
+import json
+import os
+import threading
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from session.session import create_http_session
+
+
+def _key(request):
+  url = urlsplit(request.url)
+  return '{} {}{}'.format(request.method, url.path,
+                          '?' + url.query if url.query else '')
+
+
+class RecordingAdapter(BaseAdapter):
+  def __init__(self, path, adapter):
+    """
+    @p path (str) The cassette to write when the adapter is closed.
+    @p adapter (requests.adapters.BaseAdapter) The adapter that sends requests.
+    """
+    super().__init__()
+    self._path = path
+    self._adapter = adapter
+    self._interactions = defaultdict(list)
+    self._lock = threading.Lock()
+
+  def send(self, request, **kwargs):
+    response = self._adapter.send(request, **kwargs)
+    # Reading the body here leaves it on the response for the caller.
+    content = response.content or b''
+    interaction = {'status': response.status_code, 'reason': response.reason,
+                   'headers': dict(response.headers)}
+    try:
+      interaction['body'] = content.decode('utf-8')
+    except UnicodeDecodeError:
+      interaction['body_base64'] = base64.b64encode(content).decode('ascii')
+    with self._lock:
+      self._interactions[_key(request)].append(interaction)
+    return response
+
+  def close(self):
+    """
+    Close the underlying adapter and write the cassette.
+    """
+    self._adapter.close()
+    with self._lock:
+      interactions = dict(self._interactions)
+    temporary = self._path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as out:
+      json.dump(interactions, out, ensure_ascii=False, indent=1)
+    os.replace(temporary, self._path)
+
+
+class ReplayAdapter(BaseAdapter):
+  def __init__(self, path):
+    """
+    @p path (str) A cassette written by RecordingAdapter.
+    """
+    super().__init__()
+    with open(path, encoding='utf-8') as cassette:
+      self._interactions = json.load(cassette)
+    self._played = defaultdict(int)
+    self._lock = threading.Lock()
+
+  def send(self, request, **kwargs):
+    key = _key(request)
+    recorded = self._interactions.get(key)
+    if not recorded:
+      raise requests.exceptions.ConnectionError(
+        'No recorded response for {}'.format(key), request=request)
+
+    with self._lock:
+      index = min(self._played[key], len(recorded) - 1)
+      self._played[key] += 1
+    interaction = recorded[index]
+
+    response = requests.Response()
+    response.status_code = interaction['status']
+    response.reason = interaction['reason']
+    response.headers = CaseInsensitiveDict(interaction['headers'])
+    if 'body_base64' in interaction:
+      response._content = base64.b64decode(interaction['body_base64'])
+    else:
+      response._content = interaction['body'].encode('utf-8')
+    response.encoding = 'utf-8'
+    response.url = request.url
+    response.request = request
+    return response
+
+  def close(self):
+    pass
+
+
+def recording_session(path, **kwargs):
+  """
+  @p path (str) The cassette to write when the session is closed.
+  @p kwargs Passed to session.create_http_session().
+  @return (requests.Session) A session that sends requests as usual and
+    records their responses.
+  """
+  http = create_http_session(**kwargs)
+  # create_http_session() mounts one adapter for both schemes; so does this.
+  adapter = RecordingAdapter(path, http.get_adapter('https://'))
+  http.mount('https://', adapter)
+  http.mount('http://', adapter)
+  return http
+
+
+def replay_session(path):
+  """
+  @p path (str) A cassette written through recording_session().
+  @return (requests.Session) A session that answers requests from @p path and
+    never touches the network.
+  """
+  http = requests.Session()
+  adapter = ReplayAdapter(path)
+  http.mount('https://', adapter)
+  http.mount('http://', adapter)
+  return http
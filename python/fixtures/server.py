@@ -0,0 +1,266 @@
+"""
+A local stand-in for the WaniKani V2 API. It serves a subject catalog, such as
+one from fixtures.catalog or one read from a capture with
+interface.catalog.read_subject_json(), as the paginated subjects collection,
+along with a user and their level progressions. Latency and 429 responses can
+be injected to exercise rate limiting and retries. Radical character images
+are served too, as a CDN would: their URLs are rewritten to point here, and
+each answers with a small, distinct SVG.
+
+The server understands the parts of the API the toolkit uses: the types,
+levels, ids, updated_after, and page_after_id filters, ETag validation, and
+the RateLimit headers. It runs on a background thread:
+
+  with StubServer(synthetic_catalog()) as server:
+    session = Session('token', base_url=server.base_url)
+"""
+
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# The page size of the real subjects collection.
+PER_PAGE = 1000
+
+# The limit reported in RateLimit headers, per minute.
+RATE_LIMIT = 60
+
+_PREFIX = '/v2/'
+_FILES = '/files/'
+_SVG = ('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100">'
+        '<title>{}</title><path d="M10 10L90 90" stroke="#000"/></svg>')
+
+
+class _ThreadingServer(ThreadingMixIn, HTTPServer):
+  daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+  # Keep connections alive, as the real API does, so that connection pooling
+  # behaves as it would in production.
+  protocol_version = 'HTTP/1.1'
+
+  def do_GET(self):
+    self.server.stub._handle(self)
+
+  def log_message(self, format, *args):
+    pass
+
+
+class StubServer:
+  def __init__(self, catalog, per_page=PER_PAGE, latency=0.0,
+               rate_limit_every=0, rate_limit_reset=0.0, level=60,
+               host='127.0.0.1', port=0):
+    """
+    @p catalog (list of dict) Subject JSON objects, as in the API's data array.
+    @p per_page (int) The number of subjects per page.
+    @p latency (float) Seconds to wait before answering each request.
+    @p rate_limit_every (int) Answer every Nth request with a 429; 0 never
+      does.
+    @p rate_limit_reset (float) Seconds after a 429 that its RateLimit-Reset
+      header points to.
+    @p level (int) The level of the user the server reports.
+    @p host (str) The address to listen on.
+    @p port (int) The port to listen on; 0 picks a free one.
+    """
+    self._server = _ThreadingServer((host, port), _Handler)
+    self._server.stub = self
+    address, port = self._server.server_address[:2]
+    self.base_url = 'http://{}:{}{}'.format(address, port, _PREFIX)
+    self.files_url = 'http://{}:{}{}'.format(address, port, _FILES)
+
+    self._subjects = sorted((self._local_images(item) for item in catalog),
+                            key=lambda item: item['id'])
+    # Encode once up front so serving measures the client, not the server.
+    self._encoded = [json.dumps(item).encode('utf-8')
+                     for item in self._subjects]
+    self._updated_at = max((item['data_updated_at'] for item in catalog),
+                           default=None)
+    self._per_page = per_page
+    self._latency = latency
+    self._rate_limit_every = rate_limit_every
+    self._rate_limit_reset = rate_limit_reset
+    self._level = level
+    self._lock = threading.Lock()
+    self._thread = None
+    self.requests = 0
+
+  @property
+  def catalog(self):
+    """
+    @return (list of dict) The subjects served, in ID order, with character
+      image URLs pointing at this server.
+    """
+    return self._subjects
+
+  def start(self):
+    """
+    Serve requests on a background thread until stop() is called.
+    """
+    self._thread = threading.Thread(target=self._server.serve_forever,
+                                    daemon=True)
+    self._thread.start()
+    return self
+
+  def stop(self):
+    self._server.shutdown()
+    self._server.server_close()
+    self._thread.join()
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self, *exc_info):
+    self.stop()
+
+  def _handle(self, request):
+    with self._lock:
+      self.requests += 1
+      count = self.requests
+
+    if self._latency:
+      time.sleep(self._latency)
+
+    url = urlsplit(request.path)
+    if url.path.startswith(_FILES):
+      body = _SVG.format(url.path[len(_FILES):]).encode('utf-8')
+      return self._send(request, 200, body, content_type='image/svg+xml')
+
+    resource = url.path[len(_PREFIX):] if url.path.startswith(_PREFIX) \
+      else None
+    params = dict(parse_qsl(url.query))
+
+    if not request.headers.get('Authorization', '').startswith('Bearer '):
+      return self._send(request, 401, self._error('Unauthorized', 401))
+    if self._rate_limit_every and count % self._rate_limit_every == 0:
+      return self._send(request, 429, self._error('Rate limit exceeded', 429),
+                        {'RateLimit-Remaining': '0',
+                         'RateLimit-Reset': str(
+                           int(time.time() + self._rate_limit_reset))})
+
+    if resource == 'user':
+      body = self._user()
+    elif resource == 'subjects':
+      body = self._subject_page(url, params)
+    elif resource == 'level_progressions':
+      body = self._level_progressions()
+    else:
+      return self._send(request, 404, self._error('Not found', 404))
+
+    etag = '"{}"'.format(hashlib.sha1(body).hexdigest())
+    if request.headers.get('If-None-Match') == etag:
+      return self._send(request, 304, b'', {'ETag': etag})
+    self._send(request, 200, body, {'ETag': etag})
+
+  def _local_images(self, item):
+    """
+    @return (dict) @p item, copied with its character image URLs pointing at
+      this server if it has any.
+    """
+    images = item['data'].get('character_images')
+    if not images:
+      return item
+    data = dict(item['data'], character_images=[
+      dict(image, url=self.files_url + image['url'].rsplit('/', 1)[-1])
+      for image in images])
+    return dict(item, data=data)
+
+  @staticmethod
+  def _send(request, status, body, headers=None,
+            content_type='application/json; charset=utf-8'):
+    request.send_response(status)
+    request.send_header('Content-Type', content_type)
+    request.send_header('Content-Length', str(len(body)))
+    request.send_header('RateLimit-Limit', str(RATE_LIMIT))
+    for name, value in (headers or {}).items():
+      request.send_header(name, value)
+    if 'RateLimit-Remaining' not in (headers or {}):
+      request.send_header('RateLimit-Remaining', str(RATE_LIMIT - 1))
+    request.end_headers()
+    request.wfile.write(body)
+
+  @staticmethod
+  def _error(message, code):
+    return json.dumps({'error': message, 'code': code}).encode('utf-8')
+
+  def _subject_page(self, url, params):
+    types = params['types'].split(',') if 'types' in params else None
+    levels = [int(level) for level in params['levels'].split(',')] \
+      if 'levels' in params else None
+    ids = [int(i) for i in params['ids'].split(',')] if 'ids' in params \
+      else None
+    after_id = int(params.get('page_after_id', 0))
+    updated_after = params.get('updated_after')
+
+    selected = []
+    next_url = None
+    for item, encoded in zip(self._subjects, self._encoded):
+      if item['id'] <= after_id:
+        continue
+      if types is not None and item['object'] not in types:
+        continue
+      if levels is not None and item['data']['level'] not in levels:
+        continue
+      if ids is not None and item['id'] not in ids:
+        continue
+      if updated_after and item['data_updated_at'] <= updated_after:
+        continue
+      if len(selected) == self._per_page:
+        following = dict(params, page_after_id=str(selected[-1][0]))
+        next_url = '{}subjects?{}'.format(self.base_url, urlencode(following))
+        break
+      selected.append((item['id'], encoded))
+
+    envelope = json.dumps({
+      'object': 'collection',
+      'url': '{}subjects{}'.format(self.base_url,
+                                   '?' + url.query if url.query else ''),
+      'pages': {'per_page': self._per_page, 'next_url': next_url,
+                'previous_url': None},
+      'data_updated_at': self._updated_at,
+      'data': None,
+    }).encode('utf-8')
+    # Splice the pre-encoded subjects in place of the null data member.
+    head, tail = envelope.rsplit(b'null', 1)
+    return head + b'[' + b','.join(encoded for _, encoded in selected) + b']' \
+      + tail
+
+  def _user(self):
+    return json.dumps({
+      'object': 'user',
+      'url': self.base_url + 'user',
+      'data': {
+        'id': '00000000-0000-0000-0000-000000000000',
+        'username': 'stub',
+        'level': self._level,
+        'started_at': '2017-07-10T00:00:00.000000Z',
+        'subscription': {'active': True, 'type': 'lifetime',
+                         'max_level_granted': 60, 'period_ends_at': None},
+      },
+    }).encode('utf-8')
+
+  def _level_progressions(self):
+    progressions = []
+    for level in range(1, self._level + 1):
+      started = '2017-{:02d}-01T00:00:00.000000Z'.format(min(level, 12))
+      passed = None if level == self._level else started
+      progressions.append({
+        'id': level,
+        'object': 'level_progression',
+        'data_updated_at': started,
+        'data': {'level': level, 'created_at': started,
+                 'unlocked_at': started, 'started_at': started,
+                 'passed_at': passed, 'completed_at': None,
+                 'abandoned_at': None},
+      })
+    return json.dumps({
+      'object': 'collection',
+      'url': self.base_url + 'level_progressions',
+      'pages': {'per_page': 500, 'next_url': None, 'previous_url': None},
+      'total_count': len(progressions),
+      'data': progressions,
+    }).encode('utf-8')
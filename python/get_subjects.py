@@ -1,18 +1,23 @@
 #!/usr/bin/python3 -B
 
+# Most imports are deferred to the code paths that need them, so that quick
+# invocations, such as --anki-schema or --connect to a warm daemon, do not pay
+# for loading requests, keyring, or the API interface. Run benchmark.py startup
+# to measure.
 import argparse
-import json
 import sys
 from itertools import chain
 
-from identity import identity
-from interface.interface import Interface
-from interface.subjects import Radical, Kanji, Vocabulary
-from session.session import Session, BASE_URL
+# The size of the stdout buffer, in bytes.
+OUT_BUFFER = 1 << 16
 
+# Days after which --cache empties itself; see interface.cache.DEFAULT_MAX_AGE.
+CACHE_MAX_AGE_DAYS = 30
 
-def handle_args():
+
+def handle_args(argv=None):
   """
+  @p argv (list of str) The arguments to parse; sys.argv by default.
   @return the object returned by argparse.ArgumentParser.parse_args().
   """
   parser = argparse.ArgumentParser(description=(
@@ -25,50 +30,370 @@ def handle_args():
   parser.add_argument('--level', help=('fetch subjects for this level [1-60]; '
                       'leave unspecified to fetch subjects for all levels'),
                       type=int, default=0)
+  parser.add_argument('--workers', help=('the number of levels to fetch '
+                      'concurrently when fetching all levels'),
+                      type=int, default=1)
+  parser.add_argument('--cache', help=('keep subjects in a local cache and '
+                      'only fetch changes'), action='store_true')
+  parser.add_argument('--cache-path', help=('the cache database to use; '
+                      'implies --cache'))
+  parser.add_argument('--cache-max-age', help=('empty the cache when its last '
+                      'full sync is older than this many days'),
+                      type=float, default=CACHE_MAX_AGE_DAYS)
+  parser.add_argument('--invalidate-cache', help=('empty the cache before '
+                      'fetching; implies --cache'), action='store_true')
   parser.add_argument('--characters-only', help=('print the item\'s characters '
                       'only and no other information'), action='store_true')
   group = parser.add_mutually_exclusive_group()
   group.add_argument('--original-json', help=('print original subject JSON to '
                      'stdout'), action='store_true')
+  group.add_argument('--ndjson', help=('print original subject JSON to '
+                     'stdout, one object per line'), action='store_true')
   group.add_argument('--anki', help=('print a tab-separated list of fields '
                      'per subject per line'), action='store_true')
+  group.add_argument('--apkg', help=('write an Anki deck package to this '
+                     'path instead of printing'), metavar='PATH')
   group.add_argument('--anki-schema', help='print the Anki schema',
                      action='store_true')
-  parser.add_argument('user', help='the WaniKani username to transact as')
-  return parser.parse_args()
+  group.add_argument('--snapshot', help=('write a memory-mapped catalog '
+                     'snapshot to this path instead of printing'),
+                     metavar='PATH')
+  parser.add_argument('--anki-manifest', help=('with --anki or --apkg, only '
+                      'export subjects new or changed since the export that '
+                      'last updated this manifest file'), metavar='PATH')
+  parser.add_argument('--anki-removed', help=('with --anki-manifest, write the '
+                      'IDs of subjects removed since the last export to this '
+                      'file, one per line'), metavar='PATH')
+  parser.add_argument('--anki-processes', help=('the number of processes '
+                      'formatting --anki output'), type=int, default=1)
+  parser.add_argument('--radical-images', help=('with --anki or --apkg, '
+                      'fetch the images of radicals that have no characters '
+                      'and refer to them from the characters field'),
+                      action='store_true')
+  parser.add_argument('--image-cache', help=('the directory radical images '
+                      'are kept in'), metavar='PATH')
+  parser.add_argument('--image-workers', help=('the number of radical images '
+                      'downloaded concurrently'), type=int, default=8)
+  parser.add_argument('--base-url', help=('the base URL of the V2 API, e.g. '
+                      'a fixtures/server.py stand-in; the production API by '
+                      'default'))
+  transport = parser.add_mutually_exclusive_group()
+  transport.add_argument('--record', help=('record every response to this '
+                         'cassette'), metavar='PATH')
+  transport.add_argument('--replay', help=('answer requests from this '
+                         'cassette instead of the network'), metavar='PATH')
+  parser.add_argument('--request-stats', help=('print a summary of request '
+                      'timings, sizes, and retries to stderr'),
+                      action='store_true')
+  parser.add_argument('--profile', help=('profile the run with cProfile, '
+                      'write the stats to this file, and print the top calls '
+                      'to stderr'), metavar='PATH')
+  parser.add_argument('--trace-memory', help=('trace allocations and print '
+                      'the peak and largest sites to stderr'),
+                      action='store_true')
+  daemon = parser.add_mutually_exclusive_group()
+  daemon.add_argument('--serve', help=('run as a daemon answering --connect '
+                      'requests on this Unix socket, keeping sessions, caches, '
+                      'and rate limits warm between them'), metavar='SOCKET')
+  daemon.add_argument('--connect', help=('run in the daemon serving this '
+                      'socket if there is one, or here if not'),
+                      metavar='SOCKET')
+  parser.add_argument('user', help='the WaniKani username to transact as',
+                      nargs='?')
+  args = parser.parse_args(argv)
+  if not args.user and not (args.anki_schema or args.serve):
+    parser.error('the following arguments are required: user')
+  if not 0 <= args.level <= 60:
+    parser.error('argument --level: must be between 1 and 60')
+  return args
+
+
+class WarmState:
+  """
+  What a --serve daemon keeps between requests: a session, and a rate limiter
+  shared by all of its requests, per token and base URL; and open caches.
+  """
+
+  def __init__(self):
+    self._sessions = {}
+    self._caches = {}
+
+  def session(self, token, base_url):
+    """
+    @return (tuple) A session.Session and its ratelimit.TokenBucket, or None
+      and None if the token was rejected.
+    """
+    from interface.ratelimit import TokenBucket
+    from session.session import Session
+
+    key = (token, base_url)
+    if key not in self._sessions:
+      session = Session(token, base_url=base_url)
+      if not session:
+        return None, None
+      self._sessions[key] = (session, TokenBucket())
+    return self._sessions[key]
+
+  def cache(self, path, max_age):
+    """
+    @return (cache.SubjectCache) The open cache at @p path.
+    """
+    from interface.cache import SubjectCache
+
+    key = (path, max_age)
+    if key not in self._caches:
+      self._caches[key] = SubjectCache(path, max_age=max_age)
+    return self._caches[key]
+
+
+def requested_types(args):
+  """
+  @return (list of str) The subject types to fetch, in output order.
+  """
+  types = [subject_type for subject_type, wanted in (
+             ('radical', args.radical), ('kanji', args.kanji),
+             ('vocabulary', args.vocabulary)) if wanted]
+  return types if types else ['radical', 'kanji', 'vocabulary']
+
+
+def stream_subjects(interface, args, cache, raw):
+  """
+  Yield the requested subjects grouped by type (radicals, then kanji, then
+  vocabulary) and in subject ID order within each type, fetching page by page
+  as the consumer iterates.
+
+  @p raw (bool) If True, yield subject JSON objects instead of subjects.
+  Raises interface.IncompleteCollection if the subjects could not all be
+  fetched.
+  """
+  if args.workers > 1 and args.level == 0 and cache is None:
+    # Concurrent fetches must all land before they can be ordered.
+    subjects = interface.get_subjects(args.radical, args.kanji,
+                                      args.vocabulary, args.level, raw,
+                                      args.workers)
+    if subjects is None:
+      from interface.interface import IncompleteCollection
+      raise IncompleteCollection()
+    for item in chain(subjects.radicals, subjects.kanji, subjects.vocabulary):
+      yield item.original_json if raw else item
+    return
+
+  types = requested_types(args)
+
+  if cache is not None and interface.sync_subjects(cache) is None:
+    # The cache may be missing changes it could not fetch.
+    from interface.interface import IncompleteCollection
+    raise IncompleteCollection()
+
+  # One pass per type keeps types grouped without buffering, at the cost of at
+  # most two extra requests.
+  from interface.subjects import create_subject
+
+  for subject_type in types:
+    if cache is not None:
+      items = cache.items((subject_type,), args.level)
+    else:
+      items = interface.iter_subject_json(subject_type == 'radical',
+                                          subject_type == 'kanji',
+                                          subject_type == 'vocabulary',
+                                          args.level)
+    for item in items:
+      yield item if raw else create_subject(item)
+
+
+def write_json_array(out, items):
+  """
+  Write @p items to @p out as a single JSON array, one element at a time.
+  """
+  import json
+
+  separator = '[\n'
+  for item in items:
+    out.write(separator)
+    out.write(json.dumps(item))
+    separator = ',\n'
+  out.write('[\n]\n' if separator == '[\n' else '\n]\n')
+
+
+def write_lines(out, lines):
+  """
+  Write each of @p lines to @p out followed by a newline.
+  """
+  for line in lines:
+    out.write(line)
+    out.write('\n')
+
+
+def write_output(args, items, out=None):
+  """
+  Write @p items in the format selected by @p args.
+
+  @p out (file) A text file; stdout by default.
+  """
+  if out is None:
+    # Block-buffered regardless of whether stdout is a terminal, and UTF-8
+    # regardless of the locale.
+    with open(sys.stdout.fileno(), 'w', encoding='utf-8',
+              buffering=OUT_BUFFER, closefd=False) as out:
+      return write_output(args, items, out)
+
+  if args.original_json:
+    write_json_array(out, items)
+  elif args.ndjson:
+    import json
+    write_lines(out, (json.dumps(item) for item in items))
+  elif args.anki:
+    from anki.export import write_tsv
+    write_tsv(out, items, args.anki_processes)
+  elif args.characters_only:
+    write_lines(out, (item.as_characters() for item in items))
+  else:
+    write_lines(out, (str(item) for item in items))
 
 
 def main():
   args = handle_args()
+  if args.connect:
+    from interface import daemon
+    status = daemon.connect(args.connect, sys.argv[1:])
+    if status is not None:
+      sys.exit(status)
+    # Nothing is listening; run here instead.
+
+  if args.serve:
+    from interface import daemon
+    warm = WarmState()
+    daemon.serve(args.serve, lambda argv: serve_request(argv, warm))
+  elif args.profile or args.trace_memory:
+    from interface.instrument import profiled
+    profiled(lambda: run(args), args.profile, args.trace_memory)
+  else:
+    run(args)
+
+
+def serve_request(argv, warm):
+  """
+  Run one --connect request in a --serve daemon.
+  """
+  args = handle_args(argv)
+  if args.serve:
+    print('--serve cannot be sent to a daemon.', file=sys.stderr)
+    return 2
+  if args.profile or args.trace_memory:
+    from interface.instrument import profiled
+    return profiled(lambda: run(args, warm, sys.stdout), args.profile,
+                    args.trace_memory)
+  return run(args, warm, sys.stdout)
+
 
+def run(args, warm=None, out=None):
+  """
+  @p warm (WarmState) In a daemon, the state shared between requests.
+  @p out (file) Where output goes; stdout by default.
+  """
   if args.anki_schema:
+    from interface.subjects import Radical, Kanji, Vocabulary
     print('Radicals: {}\nKanji: {}\nVocabulary: {}'.format(
       Radical.anki_schema(), Kanji.anki_schema(), Vocabulary.anki_schema()))
     sys.exit(0)
 
+  from identity import identity
+  from interface.instrument import Instrumentation
+  from interface.interface import IncompleteCollection, Interface
+  from session.session import BASE_URL
+
+  base_url = args.base_url if args.base_url else BASE_URL
+  instrumentation = Instrumentation() if args.request_stats else None
   token = identity.handle_identity(args.user, args.token)
-  session = Session(token)
+
+  # Recording and replaying need a transport of their own, so never reuse one.
+  owned = warm is None or args.record or args.replay
+  rate_limiter = None
+  if owned:
+    from session.session import Session
+    http = None
+    if args.record:
+      from fixtures.replay import recording_session
+      http = recording_session(args.record)
+    elif args.replay:
+      from fixtures.replay import replay_session
+      http = replay_session(args.replay)
+    session = Session(token, http=http, instrumentation=instrumentation,
+                      base_url=base_url)
+  else:
+    session, rate_limiter = warm.session(token, base_url)
   if not session:
     sys.exit(1)
 
-  interface = Interface(session, BASE_URL)
-  subjects = interface.get_subjects(args.radical, args.kanji, args.vocabulary,
-                                    args.level, args.original_json)
+  cache = None
+  if args.cache or args.cache_path or args.invalidate_cache:
+    max_age = args.cache_max_age * 24 * 60 * 60
+    if warm is not None:
+      cache = warm.cache(args.cache_path, max_age)
+    else:
+      from interface.cache import SubjectCache
+      cache = SubjectCache(args.cache_path, max_age=max_age)
+    if args.invalidate_cache:
+      cache.invalidate()
 
-  if args.original_json:
-    # NOTE(orphen) This could be optimized if creating the single massive JSON
-    # object can be avoided.
-    jlob = list()
-    for item in chain(subjects.radicals, subjects.kanji, subjects.vocabulary):
-      jlob.append(item.original_json)
-    for chunk in json.JSONEncoder().iterencode(jlob):
-      print(chunk)
-  elif args.anki:
-    for item in chain(subjects.radicals, subjects.kanji, subjects.vocabulary):
-      print(item.to_anki())
-  else:
-    for item in chain(subjects.radicals, subjects.kanji, subjects.vocabulary):
-      print(item.as_characters() if args.characters_only else item)
+  interface = Interface(session, base_url, rate_limiter=rate_limiter,
+                        instrumentation=instrumentation)
+  raw = args.original_json or args.ndjson or args.snapshot
+  items = stream_subjects(interface, args, cache, raw)
+
+  media = None
+  if args.radical_images and (args.anki or args.apkg):
+    from interface.assets import AssetCache, attach_radical_images
+    images = AssetCache(args.image_cache)
+    media = {}
+    items = attach_radical_images(items, images, session.http(),
+                                  args.image_workers, media, instrumentation)
+
+  manifest = None
+  if args.anki_manifest and (args.anki or args.apkg):
+    from anki.manifest import ExportManifest
+    manifest = ExportManifest(args.anki_manifest)
+    items = manifest.changed(items)
+
+  complete = True
+  try:
+    if args.apkg:
+      from anki.apkg import write_apkg
+      write_apkg(args.apkg, items, media=media)
+    elif args.snapshot:
+      from interface.snapshot import write_snapshot
+      write_snapshot(args.snapshot, items)
+    else:
+      write_output(args, items, out)
+      if media:
+        print('Radical images are in {}; copy them into your Anki profile\'s '
+              'collection.media folder.'.format(images.path), file=sys.stderr)
+  except IncompleteCollection:
+    complete = False
+    print('Could not fetch every subject; the output is incomplete.',
+          file=sys.stderr)
+
+  # Subjects missing from an incomplete fetch were not removed, so leave the
+  # manifest as it was.
+  if manifest is not None and complete:
+    removed = manifest.removed(requested_types(args), args.level)
+    if args.anki_removed:
+      with open(args.anki_removed, 'w') as removed_file:
+        write_lines(removed_file, (str(subject_id) for subject_id in removed))
+    elif removed:
+      print('{} subjects were removed since the last export.'.format(
+        len(removed)), file=sys.stderr)
+    manifest.save()
+
+  if cache is not None and warm is None:
+    cache.close()
+  if owned:
+    # Closing a recording session writes its cassette.
+    session.http().close()
+  if instrumentation is not None:
+    print(instrumentation.summary(), file=sys.stderr)
+  if not complete:
+    sys.exit(1)
 
 
 if __name__ == "__main__":
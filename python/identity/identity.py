@@ -3,7 +3,6 @@ This module handles interactions with the keyring and is used to store or
 retrieve a user API key based on a username.
 """
 
-import keyring
 import sys
 
 WKTOOLKIT_KEYRING_SERVICE = 'wktoolkit'
@@ -13,6 +12,7 @@ def get_api_key(user):
   @p user (str) The user for whom we fetch the token.
   @return An API key if one exists for the user; otherwise, None.
   """
+  import keyring  # Slow to import, as it discovers its backends.
   key = keyring.get_password(WKTOOLKIT_KEYRING_SERVICE, user)
   return None if not key else key
 
@@ -24,6 +24,7 @@ def store_api_key(user, key):
   @p user (str) The WaniKani/keyring user to update.
   @p key (str) The key to store for @p user.
   """
+  import keyring
   keyring.set_password(WKTOOLKIT_KEYRING_SERVICE, user, key)
 
 
@@ -50,3 +51,21 @@ def handle_identity(user, key):
     real_key = key
 
   return real_key
+
+
+def get_api_keys(users):
+  """
+  Look up the keys of several users in one pass over the keyring.
+
+  @p users (iterable of str) The WaniKani/keyring users.
+  @return (dict of str to str) The API key of each user that has one. Users
+    without a key are reported and omitted.
+  """
+  keys = {}
+  for user in users:
+    key = get_api_key(user)
+    if key:
+      keys[user] = key
+    else:
+      print('User {} has no corresponding token; skipping.'.format(user))
+  return keys
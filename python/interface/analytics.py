@@ -0,0 +1,73 @@
+"""
+Vectorised aggregations over the columnar collections in interface.columns.
+Requires NumPy.
+"""
+
+import numpy
+
+from interface.columns import SUBJECT_TYPES
+
+# SRS stages run from 0 (lesson not yet taken) to 9 (burned). The passing
+# stage, Guru, is srs.GURU_STAGE.
+SRS_STAGES = 10
+
+
+def accuracy(statistics):
+  """
+  @p statistics (columns.ReviewStatistics)
+  @return (dict of str to tuple of float) Per subject type, the meaning,
+    reading, and overall accuracy in [0, 1], or NaN where there are no
+    answers. Hidden subjects are excluded.
+  """
+  visible = statistics.column('hidden') == 0
+  types = statistics.column('subject_type')[visible]
+  columns = [statistics.column(name)[visible].astype('int64') for name in (
+    'meaning_correct', 'meaning_incorrect', 'reading_correct',
+    'reading_incorrect')]
+  # Sum every column per type in one pass each.
+  meaning_correct, meaning_incorrect, reading_correct, reading_incorrect = [
+    numpy.bincount(types, weights=column, minlength=len(SUBJECT_TYPES))
+    for column in columns]
+
+  with numpy.errstate(invalid='ignore', divide='ignore'):
+    meaning = meaning_correct / (meaning_correct + meaning_incorrect)
+    reading = reading_correct / (reading_correct + reading_incorrect)
+    correct = meaning_correct + reading_correct
+    overall = correct / (correct + meaning_incorrect + reading_incorrect)
+
+  return {name: (meaning[code], reading[code], overall[code])
+          for code, name in enumerate(SUBJECT_TYPES)}
+
+
+def srs_stage_counts(assignments):
+  """
+  @p assignments (columns.Assignments)
+  @return (numpy.ndarray) A len(SUBJECT_TYPES) x SRS_STAGES array counting
+    visible assignments per subject type and SRS stage.
+  """
+  visible = (assignments.column('hidden') == 0) & \
+    (assignments.column('srs_stage') >= 0)
+  types = assignments.column('subject_type')[visible].astype('int64')
+  stages = assignments.column('srs_stage')[visible].astype('int64')
+  counts = numpy.bincount(types * SRS_STAGES + stages,
+                          minlength=len(SUBJECT_TYPES) * SRS_STAGES)
+  return counts.reshape(len(SUBJECT_TYPES), SRS_STAGES)
+
+
+def due_counts(assignments, now, hours=24):
+  """
+  @p assignments (columns.Assignments)
+  @p now (numpy.datetime64) The start of the window.
+  @p hours (int) The length of the window.
+  @return (tuple) The number of reviews already due at @p now, and an array of
+    @p hours counts of reviews becoming due in each following hour.
+  """
+  available = assignments.column('available_at')
+  # Burned and locked assignments have no available_at.
+  pending = ~numpy.isnat(available) & (assignments.column('hidden') == 0)
+  offsets = (available[pending] - numpy.datetime64(now, 'us')) // \
+    numpy.timedelta64(1, 'h')
+
+  due_now = int(numpy.count_nonzero(offsets < 0))
+  upcoming = offsets[(offsets >= 0) & (offsets < hours)]
+  return due_now, numpy.bincount(upcoming.astype('int64'), minlength=hours)
@@ -0,0 +1,180 @@
+"""
+A content-addressed on-disk cache of radical character images, and a bounded
+concurrent downloader to fill it. Files are named by the SHA-256 of their
+content, so an image served under several URLs is stored once. An index maps
+each URL already fetched to its file, so a warm sync makes no requests at all.
+
+The cache directory is flat, so it can be copied into an Anki profile's
+collection.media folder as is.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from interface.instrument import timed_get
+from interface.subjects import Radical
+
+# Concurrent downloads. Images come from a CDN rather than the API, so the API
+# rate limit does not apply; this keeps within the HTTP session's pool.
+WORKERS = 8
+
+_EXTENSIONS = {'image/svg+xml': '.svg', 'image/png': '.png'}
+_INDEX = 'index.json'
+
+
+def default_asset_path():
+  """
+  @return (str) The image cache directory under $XDG_CACHE_HOME, or ~/.cache.
+  """
+  root = os.environ.get('XDG_CACHE_HOME',
+                        os.path.join(os.path.expanduser('~'), '.cache'))
+  return os.path.join(root, 'wktoolkit', 'radical-images')
+
+
+class AssetCache:
+  def __init__(self, path=None):
+    """
+    @p path (str) The cache directory, created if needed. If None,
+      default_asset_path() is used.
+    """
+    self.path = path if path else default_asset_path()
+    os.makedirs(self.path, exist_ok=True)
+    self._lock = threading.Lock()
+    try:
+      with open(os.path.join(self.path, _INDEX), encoding='utf-8') as index:
+        self._index = json.load(index)
+    except FileNotFoundError:
+      self._index = {}
+
+  def __contains__(self, url):
+    return url in self._index
+
+  def __len__(self):
+    return len(self._index)
+
+  def name(self, url):
+    """
+    @return (str) The name of the file holding @p url's content, or None if
+      it has not been fetched.
+    """
+    return self._index.get(url)
+
+  def file(self, name):
+    """
+    @return (str) The path of the file called @p name.
+    """
+    return os.path.join(self.path, name)
+
+  def store(self, url, content, content_type):
+    """
+    Add @p content, fetched from @p url, unless identical content is already
+    stored.
+
+    @p content_type (str) The MIME type of @p content; it picks the extension.
+    @return (str) The name of the file holding @p content.
+    """
+    name = hashlib.sha256(content).hexdigest() + _EXTENSIONS.get(
+      content_type.split(';')[0].strip(), '')
+    destination = self.file(name)
+    if not os.path.exists(destination):
+      temporary = '{}.{}.tmp'.format(destination, threading.get_ident())
+      with open(temporary, 'wb') as out:
+        out.write(content)
+      os.replace(temporary, destination)
+    with self._lock:
+      self._index[url] = name
+    return name
+
+  def save(self):
+    """
+    Write the URL index. Files are written as they are stored; without a save,
+    they are simply fetched again next time.
+    """
+    with self._lock:
+      index = dict(self._index)
+    temporary = os.path.join(self.path, _INDEX + '.tmp')
+    with open(temporary, 'w', encoding='utf-8') as out:
+      json.dump(index, out, sort_keys=True, indent=1)
+    os.replace(temporary, os.path.join(self.path, _INDEX))
+
+
+def fetch_assets(cache, urls, http, workers=WORKERS, instrumentation=None):
+  """
+  Download every URL in @p urls that @p cache does not hold yet.
+
+  @p cache (AssetCache) Receives the downloads; its index is saved after.
+  @p urls (iterable of str) The URLs wanted. Duplicates are fetched once.
+  @p http (requests.Session) The session to download through. No API
+    credentials are sent.
+  @p workers (int) The maximum number of downloads in flight.
+  @p instrumentation (instrument.Instrumentation) If given, receives a
+    RequestRecord per download.
+  @return (int) The number of files downloaded.
+  """
+  missing = sorted(set(url for url in urls if url not in cache))
+  if not missing:
+    return 0
+
+  def fetch(url):
+    response, record = timed_get(http, url, 'character_images')
+    if instrumentation is not None:
+      instrumentation.record(record)
+    if not response.ok:
+      print('Request for image {} failed; reason: {}'.format(url,
+        response.reason))
+      return False
+    cache.store(url, response.content,
+                response.headers.get('Content-Type', ''))
+    return True
+
+  with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+    fetched = sum(executor.map(fetch, missing))
+
+  cache.save()
+  return fetched
+
+
+def attach_radical_images(subjects, cache, http, workers=WORKERS, media=None,
+                          instrumentation=None):
+  """
+  Fetch the images of image-only radicals in @p subjects and set their
+  image_file, so the Anki export refers to them. Each run of consecutive
+  radicals is held until its images are in, and the order of @p subjects is
+  kept.
+
+  @p subjects (iterable) Radical, Kanji, and Vocabulary instances.
+  @p cache (AssetCache) Where images are kept.
+  @p media (dict of str to str) If given, each image referred to is added as
+    its name mapped to its path, as anki.apkg.write_apkg() takes.
+  @return A generator of @p subjects.
+  """
+  radicals = []
+
+  def resolve():
+    fetch_assets(cache, (radical.image_url for radical in radicals
+                         if not radical.characters and radical.image_url),
+                 http, workers, instrumentation)
+    for radical in radicals:
+      name = cache.name(radical.image_url) if not radical.characters and \
+        radical.image_url else None
+      if name:
+        radical.image_file = name
+        if media is not None:
+          media[name] = cache.file(name)
+    resolved = list(radicals)
+    del radicals[:]
+    return resolved
+
+  for subject in subjects:
+    if isinstance(subject, Radical):
+      radicals.append(subject)
+      continue
+    if radicals:
+      yield from resolve()
+    yield subject
+
+  if radicals:
+    yield from resolve()
@@ -0,0 +1,199 @@
+"""
+A persistent, on-disk cache of WaniKani subjects. Subjects are stored as their
+original JSON keyed by subject ID in an SQLite database. The cache is brought up
+to date incrementally with Interface.sync_subjects(), which only asks for
+subjects updated since the newest one cached and revalidates that request with
+ETag/Last-Modified so an unchanged catalog costs a single 304.
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+from interface.interface import MAX_LEVEL
+
+
+def default_cache_path():
+  """
+  @return (str) The cache database path under $XDG_CACHE_HOME, or ~/.cache.
+  """
+  root = os.environ.get('XDG_CACHE_HOME',
+                        os.path.join(os.path.expanduser('~'), '.cache'))
+  return os.path.join(root, 'wktoolkit', 'subjects.sqlite3')
+
+
+# Subjects rarely change, but hidden or deleted subjects are only noticed by a
+# full sync. By default, start over once a month.
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS subjects (
+  id INTEGER PRIMARY KEY,
+  object TEXT NOT NULL,
+  level INTEGER NOT NULL,
+  updated TEXT NOT NULL,
+  json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS subjects_level ON subjects (level);
+CREATE TABLE IF NOT EXISTS meta (
+  key TEXT PRIMARY KEY,
+  value TEXT NOT NULL
+);
+'''
+
+
+class SubjectCache:
+  def __init__(self, path=None, max_age=DEFAULT_MAX_AGE, max_bytes=None):
+    """
+    Open or create a cache. The eviction policy is applied on open.
+
+    @p path (str) The SQLite database file. If None, default_cache_path().
+    @p max_age (float) Seconds after the last full sync at which the cache is
+      emptied, forcing the next sync to refetch everything. None disables.
+    @p max_bytes (int) The database size above which the cache is emptied.
+      None disables.
+    """
+    self.path = path if path else default_cache_path()
+    self._max_age = max_age
+    self._max_bytes = max_bytes
+
+    directory = os.path.dirname(self.path)
+    if directory:
+      os.makedirs(directory, exist_ok=True)
+
+    self._db = sqlite3.connect(self.path)
+    self._db.executescript(_SCHEMA)
+    self.evict()
+
+  def close(self):
+    self._db.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  def __len__(self):
+    return self._db.execute('SELECT COUNT(*) FROM subjects').fetchone()[0]
+
+  def watermark(self):
+    """
+    @return (str) The newest data_updated_at timestamp cached, suitable for
+      the subjects collection's updated_after filter, or None if empty.
+    """
+    return self._db.execute('SELECT MAX(updated) FROM subjects').fetchone()[0]
+
+  def validators(self, url):
+    """
+    @p url (str) An identifier for the request being revalidated.
+    @return (dict of str) If-None-Match/If-Modified-Since headers for @p url,
+      empty if the last stored validators belong to a different request.
+    """
+    meta = self._meta()
+    if meta.get('validator_url') != url:
+      return {}
+
+    headers = {}
+    if 'etag' in meta:
+      headers['If-None-Match'] = meta['etag']
+    if 'last_modified' in meta:
+      headers['If-Modified-Since'] = meta['last_modified']
+    return headers
+
+  def store_validators(self, url, etag, last_modified):
+    """
+    Remember the ETag and Last-Modified returned for @p url. Only the latest
+    request's validators are kept.
+    """
+    with self._db:
+      self._db.execute("DELETE FROM meta WHERE key IN "
+                       "('validator_url', 'etag', 'last_modified')")
+      self._set_meta('validator_url', url)
+      if etag:
+        self._set_meta('etag', etag)
+      if last_modified:
+        self._set_meta('last_modified', last_modified)
+
+  def update(self, items, full=False):
+    """
+    Insert or replace subjects in one transaction. If iterating @p items
+    raises, nothing is written.
+
+    @p items (iterable of dict) Subject JSON objects from the subjects
+      collection.
+    @p full (bool) True if @p items came from an unfiltered sync; the age
+      policy counts from the last full sync.
+    @return (int) The number of subjects written.
+    """
+    with self._db:
+      cursor = self._db.executemany(
+        'INSERT OR REPLACE INTO subjects VALUES (?, ?, ?, ?, ?)',
+        ((item['id'], item['object'], item['data']['level'],
+          item['data_updated_at'], json.dumps(item, separators=(',', ':')))
+         for item in items))
+      if full:
+        self._set_meta('full_sync_at', str(time.time()))
+    return cursor.rowcount
+
+  def items(self, types=None, level=0):
+    """
+    @p types (iterable of str) Subject types to include; None for all.
+    @p level (int) [0-60] The level to include; 0 for all. Raises ValueError
+      for any other level.
+    @return A generator of subject JSON objects in subject ID order.
+    """
+    if not 0 <= level <= MAX_LEVEL:
+      raise ValueError('level must be between 0 and {}, not {}'.format(
+        MAX_LEVEL, level))
+
+    query = 'SELECT json FROM subjects'
+    clauses = []
+    args = []
+    if types:
+      types = list(types)
+      clauses.append('object IN ({})'.format(', '.join('?' * len(types))))
+      args.extend(types)
+    if level > 0:
+      clauses.append('level = ?')
+      args.append(level)
+    if clauses:
+      query += ' WHERE ' + ' AND '.join(clauses)
+    query += ' ORDER BY id'
+
+    return (json.loads(row[0]) for row in self._db.execute(query, args))
+
+  def invalidate(self):
+    """
+    Drop every cached subject and validator so the next sync is a full one.
+    """
+    with self._db:
+      self._db.execute('DELETE FROM subjects')
+      self._db.execute('DELETE FROM meta')
+    self._db.execute('VACUUM')
+
+  def evict(self):
+    """
+    Apply the age and size policies given at construction.
+
+    @return (bool) True if the cache was emptied.
+    """
+    if self._max_age is not None and len(self):
+      synced = float(self._meta().get('full_sync_at', 0))
+      if time.time() - synced > self._max_age:
+        self.invalidate()
+        return True
+
+    if self._max_bytes is not None:
+      if os.path.getsize(self.path) > self._max_bytes:
+        self.invalidate()
+        return True
+
+    return False
+
+  def _meta(self):
+    return dict(self._db.execute('SELECT key, value FROM meta'))
+
+  def _set_meta(self, key, value):
+    self._db.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (key, value))
@@ -0,0 +1,33 @@
+"""
+Reads subject catalogs saved by get_subjects.py, so tools can work from a local
+file instead of the API.
+"""
+
+import json
+
+
+def read_subject_json(path):
+  """
+  @p path (str) A file written by get_subjects.py --original-json (a JSON
+    array), --ndjson (one JSON object per line), or --snapshot.
+  @return A generator of subject JSON objects in file order.
+  """
+  from interface.snapshot import Snapshot, is_snapshot
+
+  if is_snapshot(path):
+    with Snapshot(path) as snapshot:
+      for item in snapshot.items():
+        yield item
+    return
+
+  with open(path, encoding='utf-8') as catalog:
+    for line in catalog:
+      line = line.strip()
+      if not line:
+        continue
+      if line.startswith('['):
+        # A JSON array has to be decoded whole.
+        for item in json.loads(line + catalog.read()):
+          yield item
+        return
+      yield json.loads(line)
@@ -0,0 +1,147 @@
+"""
+Columnar, array-backed collections of per-user WaniKani resources. Each field
+of a resource is kept in its own array.array rather than as a list of dicts, so
+tens of thousands of rows cost a few bytes per field and each column converts
+to a NumPy array with a single copy for vectorised aggregation (see
+interface.analytics).
+"""
+
+from array import array
+from collections import namedtuple
+
+from interface.time import wk_to_epoch_us
+
+# Subject types are stored as small integer codes; the index is the code.
+SUBJECT_TYPES = ('radical', 'kanji', 'vocabulary', 'kana_vocabulary')
+_SUBJECT_TYPE_CODES = {name: code for code, name in enumerate(SUBJECT_TYPES)}
+
+# A column definition. @p key names the member of the resource's data object,
+# or None for the resource ID; @p convert maps its JSON value to an array item.
+Field = namedtuple('Field', ['name', 'typecode', 'key', 'convert'])
+
+# NumPy dtypes for the array typecodes used below. Timestamp columns are
+# viewed as datetime64[us] instead.
+_DTYPES = {'b': 'int8', 'h': 'int16', 'i': 'int32', 'q': 'int64'}
+
+
+def _int(value):
+  return value if value is not None else -1
+
+
+def _bool(value):
+  return 1 if value else 0
+
+
+def _subject_type(value):
+  return _SUBJECT_TYPE_CODES[value]
+
+
+class Columns:
+  """
+  A base class for columnar collections. Subclasses define FIELDS.
+  """
+
+  FIELDS = ()
+
+  def __init__(self):
+    for field in self.FIELDS:
+      setattr(self, field.name, array(field.typecode))
+
+  def __len__(self):
+    return len(getattr(self, self.FIELDS[0].name))
+
+  def append(self, item):
+    """
+    @p item (dict) A resource JSON object from the WaniKani V2 API.
+    """
+    data = item['data']
+    # Convert the whole row first, so a bad value leaves no column longer than
+    # the others.
+    row = [field.convert(item['id'] if field.key is None
+                         else data.get(field.key))
+           for field in self.FIELDS]
+    for field, value in zip(self.FIELDS, row):
+      getattr(self, field.name).append(value)
+
+  def extend(self, items):
+    """
+    @p items (iterable of dict) Resource JSON objects, such as a page's data.
+    """
+    for item in items:
+      self.append(item)
+
+  def column(self, name):
+    """
+    Copy a column into a NumPy array. Requires NumPy. The copy is a single
+    memcpy, and unlike a view it does not stop the collection from growing.
+
+    @p name (str) The field name.
+    @return (numpy.ndarray) Timestamps are datetime64[us], with NaT for None.
+    """
+    import numpy
+
+    field = next(field for field in self.FIELDS if field.name == name)
+    dtype = ('datetime64[us]' if field.convert is wk_to_epoch_us
+             else _DTYPES[field.typecode])
+    # A view over an array.array locks it against resizing while the view is
+    # alive, so the view is dropped as soon as it is copied.
+    return numpy.frombuffer(getattr(self, name), dtype=dtype).copy()
+
+
+class Assignments(Columns):
+  """
+  Columns of the /assignments collection. Missing timestamps are NaT and a
+  missing srs_stage is -1.
+  """
+
+  FIELDS = (
+    Field('id', 'q', None, _int),
+    Field('subject_id', 'q', 'subject_id', _int),
+    Field('subject_type', 'b', 'subject_type', _subject_type),
+    Field('srs_stage', 'b', 'srs_stage', _int),
+    Field('unlocked_at', 'q', 'unlocked_at', wk_to_epoch_us),
+    Field('started_at', 'q', 'started_at', wk_to_epoch_us),
+    Field('passed_at', 'q', 'passed_at', wk_to_epoch_us),
+    Field('burned_at', 'q', 'burned_at', wk_to_epoch_us),
+    Field('available_at', 'q', 'available_at', wk_to_epoch_us),
+    Field('hidden', 'b', 'hidden', _bool),
+  )
+
+
+class ReviewStatistics(Columns):
+  """
+  Columns of the /review_statistics collection.
+  """
+
+  FIELDS = (
+    Field('id', 'q', None, _int),
+    Field('subject_id', 'q', 'subject_id', _int),
+    Field('subject_type', 'b', 'subject_type', _subject_type),
+    Field('meaning_correct', 'i', 'meaning_correct', _int),
+    Field('meaning_incorrect', 'i', 'meaning_incorrect', _int),
+    Field('meaning_max_streak', 'i', 'meaning_max_streak', _int),
+    Field('meaning_current_streak', 'i', 'meaning_current_streak', _int),
+    Field('reading_correct', 'i', 'reading_correct', _int),
+    Field('reading_incorrect', 'i', 'reading_incorrect', _int),
+    Field('reading_max_streak', 'i', 'reading_max_streak', _int),
+    Field('reading_current_streak', 'i', 'reading_current_streak', _int),
+    Field('percentage_correct', 'b', 'percentage_correct', _int),
+    Field('hidden', 'b', 'hidden', _bool),
+  )
+
+
+class Reviews(Columns):
+  """
+  Columns of the /reviews collection.
+  """
+
+  FIELDS = (
+    Field('id', 'q', None, _int),
+    Field('created_at', 'q', 'created_at', wk_to_epoch_us),
+    Field('assignment_id', 'q', 'assignment_id', _int),
+    Field('subject_id', 'q', 'subject_id', _int),
+    Field('starting_srs_stage', 'b', 'starting_srs_stage', _int),
+    Field('ending_srs_stage', 'b', 'ending_srs_stage', _int),
+    Field('incorrect_meaning_answers', 'h', 'incorrect_meaning_answers', _int),
+    Field('incorrect_reading_answers', 'h', 'incorrect_reading_answers', _int),
+  )
@@ -0,0 +1,231 @@
+"""
+Maps Japanese text to WaniKani levels. A CoverageIndex is built once from the
+kanji and vocabulary of a subject catalog and then scans any amount of text,
+counting kanji by level and finding vocabulary by longest match with a trie.
+Files are read in chunks, so their size is not limited by memory.
+"""
+
+import re
+from collections import Counter
+
+from interface.subjects import Kanji, Vocabulary
+
+LEVELS = 60
+
+# Codepoint ranges counted as kanji: the CJK unified ideographs, their
+# extensions, and the compatibility ideographs.
+KANJI_RANGES = ((0x3400, 0x4dbf), (0x4e00, 0x9fff), (0xf900, 0xfaff),
+                (0x20000, 0x3ffff))
+
+# The number of characters read from a file at a time.
+CHUNK_SIZE = 1 << 20
+
+
+def is_kanji(character):
+  code = ord(character)
+  return any(begin <= code <= end for begin, end in KANJI_RANGES)
+
+
+class DocumentCoverage:
+  """
+  Counts accumulated by CoverageIndex.scan() for one document.
+  """
+
+  def __init__(self, kanji_levels):
+    """
+    @p kanji_levels (dict of str to int) The level of each WaniKani kanji.
+    """
+    self.kanji = Counter()  # Kanji occurrences, known or not.
+    self.vocabulary = Counter()  # Occurrences of matched vocabulary.
+    self._levels = kanji_levels
+
+  def kanji_total(self):
+    return sum(self.kanji.values())
+
+  def unknown_kanji(self):
+    """
+    @return (Counter) Occurrences of kanji that are not WaniKani subjects.
+    """
+    return Counter({kanji: count for kanji, count in self.kanji.items()
+                    if kanji not in self._levels})
+
+  def coverage_by_level(self):
+    """
+    @return (list of float) Element i is the fraction of kanji occurrences
+      whose kanji is taught at or below level i + 1.
+    """
+    per_level = [0] * (LEVELS + 1)
+    for kanji, count in self.kanji.items():
+      level = self._levels.get(kanji)
+      if level:
+        per_level[level] += count
+
+    total = self.kanji_total()
+    coverage = []
+    known = 0
+    for level in range(1, LEVELS + 1):
+      known += per_level[level]
+      coverage.append(known / total if total else 1.0)
+    return coverage
+
+  def level_for(self, fraction):
+    """
+    @p fraction (float) [0, 1] The share of kanji occurrences to be known.
+    @return (int) The lowest level at which @p fraction of this document's
+      kanji are taught, or None if WaniKani never reaches it.
+    """
+    for level, coverage in enumerate(self.coverage_by_level(), 1):
+      if coverage >= fraction:
+        return level
+    return None
+
+
+class CoverageIndex:
+  def __init__(self, subjects):
+    """
+    @p subjects (iterable) Subjects, e.g. one list of a subjects.Subjects or a
+      store.SubjectStore. Kanji and vocabulary are indexed; others ignored.
+    """
+    self._kanji_levels = {}
+    self._word_levels = {}
+    trie = {}
+
+    for subject in subjects:
+      if isinstance(subject, Kanji):
+        self._kanji_levels[subject.characters] = subject.level
+      elif isinstance(subject, Vocabulary) and subject.characters:
+        self._word_levels[subject.characters] = subject.level
+        node = trie
+        for character in subject.characters:
+          node = node.setdefault(character, {})
+        node[''] = True
+
+    self._trie = trie
+    self._longest = max((len(word) for word in self._word_levels), default=1)
+    # Finds the next character that can start a word, skipping the rest of the
+    # text (typically kana and punctuation) in C.
+    self._starts = re.compile('[{}]'.format(''.join(
+      re.escape(character) for character in sorted(trie)))) if trie else None
+
+  def kanji_level(self, kanji):
+    """
+    @return (int) The level @p kanji is taught at, or None.
+    """
+    return self._kanji_levels.get(kanji)
+
+  def word_level(self, word):
+    """
+    @return (int) The level the vocabulary @p word is taught at, or None.
+    """
+    return self._word_levels.get(word)
+
+  def words(self, text):
+    """
+    @return A generator of the vocabulary found in @p text, scanning left to
+      right and taking the longest match at each position.
+    """
+    for start, end in self._matches(text, len(text)):
+      yield text[start:end]
+
+  def _matches(self, text, stop):
+    """
+    @return A generator of the [start, end) spans of the words() of @p text
+      that start before @p stop.
+    """
+    if self._starts is None:
+      return
+
+    # A hand-rolled trie walk, one dict lookup per character, entered only
+    # where a word can start.
+    trie = self._trie
+    search = self._starts.search
+    length = len(text)
+    start = 0
+    while True:
+      match = search(text, start, stop)
+      if match is None:
+        return
+      start = match.start()
+      node = trie[text[start]]
+
+      end = start + 1 if '' in node else 0
+      position = start + 1
+      while position < length:
+        node = node.get(text[position])
+        if node is None:
+          break
+        position += 1
+        if '' in node:
+          end = position
+
+      if end:
+        yield start, end
+        start = end
+      else:
+        start += 1
+
+  def scan(self, text, coverage=None):
+    """
+    Count the kanji and vocabulary in @p text.
+
+    @p coverage (DocumentCoverage) Counts to add to, so a document can be
+      scanned in pieces. If None, a new one is started.
+    @return The DocumentCoverage.
+    """
+    return self._scan(text, len(text), coverage)[0]
+
+  def scan_file(self, path, encoding='utf-8', chunk_size=CHUNK_SIZE):
+    """
+    Scan a text file of any size a chunk at a time. Chunks are cut at line
+    breaks, or in a chunk without one, after the last word that cannot run on
+    into the next chunk, so no word is split.
+
+    @return The file's DocumentCoverage.
+    """
+    coverage = None
+    with open(path, encoding=encoding, errors='replace') as text:
+      carry = ''
+      while True:
+        chunk = text.read(chunk_size)
+        if not chunk:
+          break
+        chunk = carry + chunk
+        cut = chunk.rfind('\n') + 1
+        if cut:
+          carry = chunk[cut:]
+          coverage = self.scan(chunk[:cut], coverage)
+        else:
+          # Any word starting this close to the end might continue past it.
+          coverage, cut = self._scan(
+            chunk, max(len(chunk) - self._longest + 1, 0), coverage)
+          carry = chunk[cut:]
+      if carry:
+        coverage = self.scan(carry, coverage)
+
+    return coverage if coverage else self.scan('')
+
+  def _scan(self, text, stop, coverage):
+    """
+    scan() the start of @p text: the words starting before @p stop, and the
+    kanji up to the end of the last of them or @p stop, whichever is later.
+
+    @return (tuple) The DocumentCoverage, and where the part scanned ends.
+    """
+    if coverage is None:
+      coverage = DocumentCoverage(self._kanji_levels)
+
+    cut = [stop]
+    def words():
+      for start, end in self._matches(text, stop):
+        cut[0] = end
+        yield text[start:end]
+    coverage.vocabulary.update(words())
+    cut = max(cut[0], stop)
+
+    # Counting every character is done in C; only distinct characters are
+    # then classified.
+    for character, count in Counter(text if cut == len(text)
+                                    else text[:cut]).items():
+      if is_kanji(character):
+        coverage.kanji[character] += count
+    return coverage, cut
@@ -0,0 +1,173 @@
+"""
+A long-lived process that runs command lines sent to it over a Unix socket.
+Repeated invocations of a script then skip interpreter startup and imports,
+and reuse whatever state the script keeps between requests, such as sessions
+and open caches.
+
+The client sends one line of JSON holding its arguments and working directory.
+The daemon answers with frames, each a kind byte, a 4-byte big-endian length,
+and a payload: stdout data, stderr data, and finally the exit status. Requests
+are served one at a time, in the daemon's main thread.
+"""
+
+import io
+import json
+import os
+import socket
+import struct
+import sys
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+
+STDOUT = b'o'
+STDERR = b'e'
+EXIT = b'x'
+
+_HEADER = struct.Struct('>cI')
+
+# The size of the buffers in front of the socket, in bytes.
+BUFFER_SIZE = 1 << 16
+
+
+def _frame(kind, payload):
+  return _HEADER.pack(kind, len(payload)) + payload
+
+
+class _FrameWriter(io.RawIOBase):
+  def __init__(self, connection, kind):
+    self._connection = connection
+    self._kind = kind
+
+  def writable(self):
+    return True
+
+  def write(self, data):
+    self._connection.sendall(_frame(self._kind, bytes(data)))
+    return len(data)
+
+
+def _stream(connection, kind):
+  return io.TextIOWrapper(io.BufferedWriter(_FrameWriter(connection, kind),
+                                            BUFFER_SIZE), encoding='utf-8')
+
+
+def _exit_status(code):
+  """
+  @p code The code of a SystemExit.
+  @return (int) The status a process exiting with @p code would have.
+  """
+  if code is None:
+    return 0
+  if isinstance(code, int):
+    return code
+  print(code, file=sys.stderr)
+  return 1
+
+
+def serve(path, handle):
+  """
+  Serve requests on a Unix socket until interrupted. The socket is only
+  accessible to the current user.
+
+  @p path (str) The socket path. A stale socket left by a daemon that exited
+    uncleanly is replaced.
+  @p handle (callable) Called with each request's argument list, while stdout
+    and stderr go to the client and the working directory is the client's.
+    Its return value, or the code of a SystemExit it raises, is the client's
+    exit status.
+  """
+  if os.path.exists(path):
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+      probe.connect(path)
+      raise RuntimeError('A daemon is already serving {}'.format(path))
+    except ConnectionRefusedError:
+      os.unlink(path)
+    finally:
+      probe.close()
+
+  server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  umask = os.umask(0o177)
+  try:
+    server.bind(path)
+  finally:
+    os.umask(umask)
+  server.listen(8)
+
+  try:
+    while True:
+      connection, _ = server.accept()
+      with connection:
+        try:
+          _serve_request(connection, handle)
+        except OSError:
+          # The client went away; there is nobody left to report to.
+          pass
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.close()
+    os.unlink(path)
+
+
+def _serve_request(connection, handle):
+  with connection.makefile('rb') as reader:
+    request = json.loads(reader.readline().decode('utf-8'))
+
+  out = _stream(connection, STDOUT)
+  err = _stream(connection, STDERR)
+  cwd = os.getcwd()
+  try:
+    os.chdir(request['cwd'])
+    with redirect_stdout(out), redirect_stderr(err):
+      try:
+        status = _exit_status(handle(request['argv']))
+      except SystemExit as exit:
+        status = _exit_status(exit.code)
+      except Exception:
+        traceback.print_exc()
+        status = 1
+    out.flush()
+    err.flush()
+  finally:
+    os.chdir(cwd)
+
+  connection.sendall(_frame(EXIT, str(status).encode('ascii')))
+
+
+def connect(path, argv):
+  """
+  Run a command line in the daemon serving @p path, copying its output to
+  this process's stdout and stderr.
+
+  @p argv (list of str) The arguments, without the program name.
+  @return (int) The exit status, or None if no daemon is listening.
+  """
+  client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  try:
+    client.connect(path)
+  except (FileNotFoundError, ConnectionRefusedError):
+    client.close()
+    return None
+
+  with client, client.makefile('rb') as reader:
+    client.sendall(json.dumps({'argv': argv, 'cwd': os.getcwd()})
+                   .encode('utf-8') + b'\n')
+    sys.stdout.flush()
+    while True:
+      header = reader.read(_HEADER.size)
+      if len(header) < _HEADER.size:
+        print('The daemon at {} closed the connection.'.format(path),
+              file=sys.stderr)
+        return 1
+      kind, length = _HEADER.unpack(header)
+      payload = reader.read(length)
+      if kind == EXIT:
+        sys.stdout.buffer.flush()
+        return int(payload)
+      if kind == STDOUT:
+        sys.stdout.buffer.write(payload)
+      else:
+        sys.stdout.buffer.flush()
+        sys.stderr.buffer.write(payload)
+        sys.stderr.buffer.flush()
@@ -0,0 +1,100 @@
+"""
+Forecasts of upcoming review load over a user's assignments. Requires NumPy.
+
+forecast() counts the reviews already scheduled by each assignment's
+available_at. simulate() also projects the reviews those will cause in turn, by
+advancing every assignment through the SRS under an assumed accuracy. Both work
+on whole columns at once: simulate() loops once per review an assignment can
+have within the horizon, not once per assignment or per hour.
+"""
+
+from collections import namedtuple
+
+import numpy
+
+from interface.analytics import SRS_STAGES
+from interface.srs import ACCELERATED_INTERVALS, GURU_STAGE, STANDARD_INTERVALS
+
+BURNED_STAGE = SRS_STAGES - 1
+# Stages from Guru up drop twice as far on an incorrect answer.
+PENALTY_STAGE = GURU_STAGE
+
+# Review counts per hour and per day, starting from the forecast's start.
+Forecast = namedtuple('Forecast', ['hourly', 'daily'])
+
+
+def _pending(assignments, now):
+  """
+  @return (tuple of numpy.ndarray) The hours from @p now until each pending
+    review, floored and with overdue reviews at 0, and the stage of each.
+  """
+  available = assignments.column('available_at')
+  stages = assignments.column('srs_stage')
+  pending = ~numpy.isnat(available) & (assignments.column('hidden') == 0) & \
+    (stages > 0) & (stages < BURNED_STAGE)
+  offsets = (available[pending] - numpy.datetime64(now, 'us')) // \
+    numpy.timedelta64(1, 'h')
+  return numpy.maximum(offsets, 0), stages[pending].astype('int64')
+
+
+def _forecast(hourly, days):
+  return Forecast(hourly, hourly.reshape(days, 24).sum(axis=1))
+
+
+def forecast(assignments, now, days=30):
+  """
+  @p assignments (columns.Assignments)
+  @p now (numpy.datetime64) The start of the forecast. Overdue reviews are
+    counted in its first hour.
+  @p days (int) The length of the forecast.
+  @return A Forecast of reviews already scheduled.
+  """
+  hours = days * 24
+  offsets, _ = _pending(assignments, now)
+  offsets = offsets[offsets < hours]
+  return _forecast(numpy.bincount(offsets, minlength=hours), days)
+
+
+def simulate(assignments, now, days=30, accuracy=0.9, runs=32, seed=None,
+             intervals=STANDARD_INTERVALS):
+  """
+  Project review load including the reviews that future answers schedule.
+  Each review is answered correctly with probability @p accuracy; a correct
+  answer advances the stage and an incorrect one drops it by one, or by two
+  from PENALTY_STAGE up, but never below 1. Reviews are assumed to be done in
+  the hour they become available.
+
+  @p assignments (columns.Assignments)
+  @p now (numpy.datetime64) The start of the forecast.
+  @p days (int) The length of the forecast.
+  @p accuracy (float) [0, 1] The probability of answering a review correctly.
+  @p runs (int) The number of Monte Carlo runs averaged.
+  @p seed Seeds the random generator for a repeatable result.
+  @p intervals (sequence of int) Hours until the next review per stage.
+  @return A Forecast of the expected number of reviews.
+  """
+  hours = days * 24
+  offsets, stages = _pending(assignments, now)
+  interval = numpy.asarray(intervals, dtype='int64')
+  rng = numpy.random.default_rng(seed)
+
+  # Every run's copy of every assignment advances side by side.
+  due = numpy.tile(offsets, runs)
+  stage = numpy.tile(stages, runs)
+  active = numpy.flatnonzero(due < hours)
+  counts = numpy.zeros(hours, dtype='int64')
+
+  while active.size:
+    counts += numpy.bincount(due[active], minlength=hours)
+
+    current = stage[active]
+    correct = rng.random(active.size) < accuracy
+    drop = numpy.where(current >= PENALTY_STAGE, 2, 1)
+    current = numpy.where(correct, current + 1,
+                          numpy.maximum(current - drop, 1))
+
+    stage[active] = current
+    due[active] += interval[current]
+    active = active[(current < BURNED_STAGE) & (due[active] < hours)]
+
+  return _forecast(counts / runs, days)
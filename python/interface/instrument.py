@@ -0,0 +1,186 @@
+"""
+Instrumentation for requests to the WaniKani API and opt-in profiling of entry
+points. An Instrumentation instance collects one RequestRecord per request,
+passes each to any registered hooks, and summarises a run.
+"""
+
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from interface.jsonbackend import loads
+
+RequestRecord = namedtuple('RequestRecord', [
+  'resource',   # The resource requested, as passed to the Interface (str).
+  'status',     # The HTTP status, or None if no response arrived (int).
+  'ttfb',       # Seconds from sending until the headers were parsed. This
+                # includes any DNS lookup and connection setup, which requests
+                # does not expose separately (float).
+  'body',       # Seconds spent reading the body after the headers (float).
+  'decode',     # Seconds spent decoding JSON; 0 if not decoded (float).
+  'bytes',      # Body bytes received, after content decoding (int).
+  'retries',    # Retries after 429s plus transport-level retries (int).
+  'rate_limit_remaining',  # From the RateLimit-Remaining header, or None.
+  'rate_limit_limit',      # From the RateLimit-Limit header, or None.
+])
+
+
+def _header_int(response, name):
+  try:
+    return int(response.headers.get(name))
+  except (TypeError, ValueError):
+    return None
+
+
+def timed_get(http, url, resource, retries=0, **kwargs):
+  """
+  GET @p url and read its body, timing both.
+
+  @p http (requests.Session) The session to send the request through.
+  @p resource (str) The name to record the request under.
+  @p retries (int) Retries already made for this request by the caller.
+  @p kwargs Passed to requests.Session.get().
+  @return (tuple) The requests.Response, with its body read, and a
+    RequestRecord whose decode time is 0.
+  """
+  start = time.perf_counter()
+  response = http.get(url, stream=True, **kwargs)
+  headers_read = time.perf_counter()
+  content = response.content
+  body = time.perf_counter() - headers_read
+
+  # urllib3 records transport-level retries on the raw response.
+  history = getattr(getattr(response.raw, 'retries', None), 'history', ())
+  ttfb = response.elapsed.total_seconds() if response.elapsed else \
+    headers_read - start
+
+  return response, RequestRecord(
+    resource, response.status_code, ttfb, body, 0.0,
+    len(content) if content else 0, retries + len(history or ()),
+    _header_int(response, 'RateLimit-Remaining'),
+    _header_int(response, 'RateLimit-Limit'))
+
+
+def timed_json(response, record, decode=loads):
+  """
+  Decode @p response's JSON body, timing the decode.
+
+  @p decode (callable) Decodes the body bytes; the fastest installed JSON
+    backend by default.
+  @return (tuple) The decoded object and @p record with its decode time.
+  """
+  start = time.perf_counter()
+  data = decode(response.content)
+  return data, record._replace(decode=time.perf_counter() - start)
+
+
+class Instrumentation:
+  def __init__(self):
+    self.records = []
+    self._hooks = []
+    self._lock = threading.Lock()
+
+  def add_hook(self, hook):
+    """
+    @p hook (callable) Called with each RequestRecord as it is recorded, on
+      the thread that made the request.
+    """
+    self._hooks.append(hook)
+
+  def record(self, record):
+    """
+    Keep @p record and pass it to every hook.
+    """
+    with self._lock:
+      self.records.append(record)
+    for hook in self._hooks:
+      hook(record)
+
+  def summary(self):
+    """
+    @return (str) A human-readable report of the requests recorded so far.
+    """
+    with self._lock:
+      records = list(self.records)
+    if not records:
+      return 'No requests recorded.'
+
+    def percentile(values, fraction):
+      values = sorted(values)
+      return values[min(len(values) - 1, int(fraction * len(values)))]
+
+    totals = [record.ttfb + record.body + record.decode for record in records]
+    failures = sum(1 for record in records
+                   if record.status is None or record.status >= 400)
+    headroom = [record.rate_limit_remaining for record in records
+                if record.rate_limit_remaining is not None]
+
+    lines = [
+      'Requests: {} ({} failed, {} retries)'.format(
+        len(records), failures, sum(record.retries for record in records)),
+      'Time: {:.3f} s total; per request p50 {:.3f} s, p95 {:.3f} s'.format(
+        sum(totals), percentile(totals, 0.5), percentile(totals, 0.95)),
+      'Time to first byte: {:.3f} s; body: {:.3f} s; JSON decode: {:.3f} s'
+        .format(sum(record.ttfb for record in records),
+                sum(record.body for record in records),
+                sum(record.decode for record in records)),
+      'Received: {:.1f} KB'.format(
+        sum(record.bytes for record in records) / 1e3),
+    ]
+    if headroom:
+      lines.append('Rate limit headroom: min {} remaining'.format(
+        min(headroom)))
+
+    by_resource = {}
+    for record, total in zip(records, totals):
+      resource = record.resource.split('?')[0].rstrip('/').split('/')[-1]
+      count, seconds = by_resource.get(resource, (0, 0.0))
+      by_resource[resource] = (count + 1, seconds + total)
+    for resource, (count, seconds) in sorted(by_resource.items()):
+      lines.append('  {}: {} requests, {:.3f} s'.format(resource, count,
+                                                        seconds))
+    return '\n'.join(lines)
+
+
+def profiled(function, profile_path=None, trace_memory=False, out=None):
+  """
+  Run @p function under cProfile and/or tracemalloc and report on it.
+
+  @p profile_path (str) If given, profile and write pstats data here, and
+    print the 20 most expensive calls by cumulative time.
+  @p trace_memory (bool) If True, trace allocations and print the peak and the
+    10 largest allocation sites still live at the end.
+  @p out (file) Where reports go; stderr by default.
+  @return Whatever @p function returns.
+  """
+  # Imported here; they are only needed when profiling is asked for.
+  import cProfile
+  import io
+  import pstats
+  import tracemalloc
+
+  out = out if out else sys.stderr
+  profile = cProfile.Profile() if profile_path else None
+  if trace_memory:
+    tracemalloc.start()
+  if profile:
+    profile.enable()
+
+  try:
+    return function()
+  finally:
+    if profile:
+      profile.disable()
+      profile.dump_stats(profile_path)
+      report = io.StringIO()
+      pstats.Stats(profile, stream=report).sort_stats('cumulative') \
+        .print_stats(20)
+      out.write(report.getvalue())
+    if trace_memory:
+      snapshot = tracemalloc.take_snapshot()
+      _, peak = tracemalloc.get_traced_memory()
+      tracemalloc.stop()
+      out.write('Peak traced memory: {:.1f} MB\n'.format(peak / 1e6))
+      for stat in snapshot.statistics('lineno')[:10]:
+        out.write('  {}\n'.format(stat))
@@ -2,23 +2,51 @@
 An interface to and abstraction over the WaniKani V2 API.
 """
 
-import requests
-from urllib.parse import urljoin
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urljoin
 
+from interface.columns import Assignments, ReviewStatistics, Reviews
+from interface.instrument import timed_get, timed_json
+from interface.jsonbackend import (loads, decode_subject_page,
+                                   typed_subjects_available)
 from interface.level import Level
-from interface.subjects import Subjects, Radical, Kanji, Vocabulary
+from interface.ratelimit import TokenBucket, REQUEST_WINDOW
+from interface.subjects import (Subjects, Radical, Kanji, Vocabulary,
+                                create_subject)
 from interface.time import wk_to_datetime
 
 
+MAX_LEVEL = 60
+
+# How many times a request is retried after a 429 before giving up.
+RATE_LIMIT_RETRIES = 3
+
+
+class IncompleteCollection(Exception):
+  """
+  Raised when a paginated collection could not be read to its end because a
+  page failed, so a partial result is never mistaken for a complete one.
+  """
+
+
 class Interface():
-  def __init__(self, session, base_url):
+  def __init__(self, session, base_url, rate_limiter=None,
+               instrumentation=None):
     """
     @p session A Session instance. This instance is assumed to be valid.
     @p base_url The base URL to the WaniKani V2 API.
+    @p rate_limiter (ratelimit.TokenBucket) Shared by every request made
+      through this instance. If None, a bucket matching WaniKani's documented
+      limit is created.
+    @p instrumentation (instrument.Instrumentation) If given, receives a
+      RequestRecord for every request made through this instance.
     """
     self._session = session
-    self._headers = {'Authorization': 'Bearer {}'.format(session.token())}
+    self._headers = session.headers()
     self._base_url = base_url
+    self._rate_limiter = rate_limiter if rate_limiter else TokenBucket()
+    self._instrumentation = instrumentation
 
   def get_current_level(self):
     """
@@ -36,8 +64,62 @@ class Interface():
                  wk_to_datetime(data['data']['passed_at']),
                  wk_to_datetime(data['data']['abandoned_at']))
 
+  def get_assignments(self, updated_after=None, params=None):
+    """
+    Fetch every page of the user's assignments into columns.
+
+    @p updated_after (str) A WaniKani timestamp; if given, only assignments
+      updated after it are fetched.
+    @p params (dict of str) Further filters for the /assignments collection,
+      such as {'subject_types': 'kanji', 'levels': '5'}.
+    @return A columns.Assignments, or None on error.
+    """
+    return self._get_columns('assignments', Assignments(), updated_after,
+                             params)
+
+  def get_review_statistics(self, updated_after=None, params=None):
+    """
+    Fetch every page of the user's review statistics into columns.
+
+    @p updated_after (str) As in get_assignments().
+    @p params (dict of str) Further filters for the /review_statistics
+      collection.
+    @return A columns.ReviewStatistics, or None on error.
+    """
+    return self._get_columns('review_statistics', ReviewStatistics(),
+                             updated_after, params)
+
+  def get_reviews(self, updated_after=None, params=None):
+    """
+    Fetch every page of the user's reviews into columns.
+
+    @p updated_after (str) As in get_assignments().
+    @p params (dict of str) Further filters for the /reviews collection.
+    @return A columns.Reviews, or None on error.
+    """
+    return self._get_columns('reviews', Reviews(), updated_after, params)
+
+  def _get_columns(self, resource, columns, updated_after, params):
+    """
+    Append each page of a collection to @p columns as it arrives.
+
+    @return @p columns, or None if any page could not be fetched.
+    """
+    params = dict(params) if params else {}
+    if updated_after:
+      params['updated_after'] = updated_after
+
+    page = None
+    for page in self._get_pages(resource, params=params):
+      columns.extend(page['data'])
+
+    if page is None or page['pages']['next_url']:
+      return None
+    return columns
+
   def get_subjects(self, radicals=True, kanji=True,
-                   vocabulary=True, level=0, store_json=False):
+                   vocabulary=True, level=0, store_json=False, workers=1,
+                   cache=None):
     """
     Fetch subjects from WaniKani. By default, all subject types are fetched for
     all levels.
@@ -46,60 +128,335 @@ class Interface():
     @p kanji (bool) Indicates whether kanji should be fetched.
     @p vocabulary (bool) Indicates whether vocabulary should be fetched.
     @p level (int) [0-60] Inidcates which level to fetch subjects for.
-      0 is the default and results in querying for subjects of all levels.
+      0 is the default and results in querying for subjects of all levels; all
+      pages of the collection are followed.
     @p store_json (bool) Store the original, raw JSON in each subject's object.
-    @return An instance of subjects.Subjects.
+    @p workers (int) When fetching all levels, the number of levels fetched
+      concurrently. Requests still share this instance's rate limiter and the
+      session's connection pool, which should be at least this large. The
+      result is ordered by subject ID regardless of @p workers.
+    @p cache (cache.SubjectCache) If given, the cache is brought up to date
+      with sync_subjects() and subjects are read from it; @p workers is unused.
+    @return An instance of subjects.Subjects, or None if any page could not be
+      fetched.
     """
-    params = {}
+    try:
+      return self._fetch_subjects(radicals, kanji, vocabulary, level,
+                                  store_json, workers, cache)
+    except IncompleteCollection:
+      return None
+
+  def _fetch_subjects(self, radicals, kanji, vocabulary, level, store_json,
+                      workers, cache):
+    """
+    get_subjects(), raising IncompleteCollection if any page fails.
+    """
+    if cache is not None or level > 0 or workers <= 1:
+      subjects = Subjects([], [], [])
+      for item in self._subject_items(radicals, kanji, vocabulary, level,
+                                      cache, store_json):
+        self._append_subject(subjects, item, store_json)
+      return subjects
+
+    types = self._subject_types(radicals, kanji, vocabulary)
+    decode = self._subject_decoder(store_json)
+
+    def fetch_level(shard):
+      return self._collect_subjects(self._subject_params(types, shard),
+                                    store_json, Subjects([], [], []), decode)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+      shards = list(executor.map(fetch_level, range(1, MAX_LEVEL + 1)))
+
+    # Merge into the order a single sequential request would have produced.
+    subjects = Subjects([], [], [])
+    for index, collection in enumerate(subjects):
+      for shard in shards:
+        collection.extend(shard[index])
+      collection.sort(key=lambda subject: subject.id)
+
+    return subjects
+
+  def iter_subjects(self, radicals=True, kanji=True, vocabulary=True, level=0,
+                    store_json=False, cache=None):
+    """
+    Like get_subjects(), but yield each subject as soon as its page arrives
+    instead of collecting them. Subjects are yielded in subject ID order.
+
+    @return A generator of Radical, Kanji, and Vocabulary instances. It raises
+      IncompleteCollection once the subjects received run out if any page
+      could not be fetched.
+    """
+    for item in self._subject_items(radicals, kanji, vocabulary, level, cache,
+                                    store_json):
+      yield create_subject(item, store_json)
+
+  def iter_subject_json(self, radicals=True, kanji=True, vocabulary=True,
+                        level=0, cache=None):
+    """
+    Like iter_subjects(), but yield the subjects' original JSON objects.
+
+    @return A generator of dicts in subject ID order. Raises
+      IncompleteCollection as iter_subjects() does, or before yielding
+      anything if @p cache could not be brought up to date.
+    """
+    types = self._subject_types(radicals, kanji, vocabulary)
+
+    if cache is not None:
+      if self.sync_subjects(cache) is None:
+        raise IncompleteCollection()
+      # Levels are clamped as _subject_params() clamps them for the API.
+      for item in cache.items(types.split(',') if types else None,
+                              min(level, MAX_LEVEL) if level > 0 else 0):
+        yield item
+      return
+
+    for page in self._complete(self._get_pages(
+        'subjects', params=self._subject_params(types, level))):
+      for item in page['data']:
+        yield item
+
+  def _subject_items(self, radicals, kanji, vocabulary, level, cache,
+                     store_json):
+    """
+    Like iter_subject_json(), but when nothing needs the original JSON, pages
+    fetched from the API are decoded straight into typed structs if msgspec is
+    installed. The structs support the item access the Subject constructors
+    use.
+    """
+    decode = self._subject_decoder(store_json)
+    if cache is not None or decode is loads:
+      return self.iter_subject_json(radicals, kanji, vocabulary, level, cache)
+
+    types = self._subject_types(radicals, kanji, vocabulary)
+    return (item
+            for page in self._complete(self._get_pages(
+              'subjects', params=self._subject_params(types, level),
+              decode=decode))
+            for item in page['data'])
+
+  @staticmethod
+  def _subject_decoder(store_json):
+    """
+    @return (callable) The decoder for pages of subjects: typed structs where
+      available, unless @p store_json requires the original JSON.
+    """
+    if store_json or not typed_subjects_available():
+      return loads
+    return decode_subject_page
 
-    params['types'] = []
+  @staticmethod
+  def _subject_types(radicals, kanji, vocabulary):
+    """
+    @return (str) A comma-delimited list of subject types for the types filter
+      of the subjects collection, or an empty string for all types.
+    """
+    # The API expects a comma-delimited list rather than a repeated parameter.
+    types = []
     if radicals:
-      params['types'].append('radical')
+      types.append('radical')
     if kanji:
-      params['types'].append('kanji')
+      types.append('kanji')
     if vocabulary:
-      params['types'].append('vocabulary')
+      types.append('vocabulary')
+    return ','.join(types)
 
+  @staticmethod
+  def _subject_params(types, level):
+    """
+    @p types (str) As returned by _subject_types().
+    @p level (int) [0-60] The level to filter by; 0 means all levels.
+    @return (dict of str) Parameters for a request to the subjects collection.
+    """
+    params = {}
+    if types:
+      params['types'] = types
     if level > 0:
-      if level > 60:
-        params['levels'] = '60'
-      else:
-        params['levels'] = str(level)
-    else:
-      raise NotImplementedError(
-        'Fetching subjects for all levels is currently not supported.')
+      params['levels'] = str(min(level, MAX_LEVEL))
+    return params
 
-    subjects = Subjects([], [], [])
-    data = self._get('subjects', params=params)
-
-    if data:
-      data = data['data']
+  def _collect_subjects(self, params, store_json, subjects, decode=loads):
+    """
+    Fetch every page of the subjects collection matching @p params and append
+    the parsed subjects to @p subjects.
 
-      for item in data:
-        if item['object'] == 'radical':
-          subjects.radicals.append(Radical(item, store_json))
-        if item['object'] == 'kanji':
-          subjects.kanji.append(Kanji(item, store_json))
-        if item['object'] == 'vocabulary':
-          subjects.vocabulary.append(Vocabulary(item, store_json))
+    @p decode (callable) Decodes each page's body.
+    @return @p subjects. Raises IncompleteCollection if any page could not be
+      fetched.
+    """
+    # Parse each page as it arrives so only one raw page is held at a time.
+    for page in self._complete(self._get_pages('subjects', params=params,
+                                               decode=decode)):
+      for item in page['data']:
+        self._append_subject(subjects, item, store_json)
 
     return subjects
 
-  def _get(self, resource, params=None, hdrs=None):
+  @staticmethod
+  def _append_subject(subjects, item, store_json):
+    """
+    Parse the subject JSON object @p item and append it to the matching list
+    of @p subjects.
+    """
+    if item['object'] == 'radical':
+      subjects.radicals.append(Radical(item, store_json))
+    if item['object'] == 'kanji':
+      subjects.kanji.append(Kanji(item, store_json))
+    if item['object'] == 'vocabulary':
+      subjects.vocabulary.append(Vocabulary(item, store_json))
+
+  def sync_subjects(self, cache):
+    """
+    Bring a subject cache up to date. Only subjects updated after the newest
+    cached subject are requested, and the request is made conditional on the
+    validators of the previous identical request, so an unchanged catalog
+    costs one 304.
+
+    @p cache (cache.SubjectCache) The cache to update.
+    @return (int) The number of subjects written to @p cache, or None on error.
+    """
+    params = {}
+    watermark = cache.watermark()
+    if watermark:
+      params['updated_after'] = watermark
+    key = 'subjects?' + urlencode(params)
+
+    response, record = self._request('subjects', params=params,
+                                     hdrs=cache.validators(key))
+    if response is None:
+      return None
+    if response.status_code == 304:
+      self._record(record)
+      return 0
+
+    def items():
+      # If a page fails, abort so the cache rolls back rather than advancing
+      # its watermark past subjects it never received.
+      for page in self._complete(self._follow_pages(self._decode(response,
+                                                                 record))):
+        for item in page['data']:
+          yield item
+
+    try:
+      count = cache.update(items(), full=not watermark)
+    except IncompleteCollection:
+      return None
+
+    cache.store_validators(key, response.headers.get('ETag'),
+                           response.headers.get('Last-Modified'))
+    return count
+
+  def _get_pages(self, resource, params=None, hdrs=None, decode=loads):
+    """
+    Walk a paginated collection from its first page to its last by following
+    each page's pages.next_url.
+
+    @p resource (str) The REST collection to GET, appended to the base URL.
+    @p params (dict of str) Parameters to add to the first request. Subsequent
+      requests carry them forward through next_url.
+    @p hdrs (dict of str) Headers to add to each request.
+    @p decode (callable) Decodes each page's body.
+    @return A generator of decoded pages. Iteration stops early if a request
+      fails; see _complete().
+    """
+    return self._follow_pages(self._get(resource, params=params, hdrs=hdrs,
+                                        decode=decode),
+                              hdrs=hdrs, decode=decode)
+
+  @staticmethod
+  def _complete(pages):
+    """
+    @p pages A generator of pages, as returned by _get_pages().
+    @return A generator of the same pages that raises IncompleteCollection
+      after the last one received if it is not the collection's last page.
+    """
+    page = None
+    for page in pages:
+      yield page
+    if page is None or ('pages' in page and page['pages']['next_url']):
+      raise IncompleteCollection()
+
+  def _follow_pages(self, page, hdrs=None, decode=loads):
+    """
+    @p page (dict) A page of a collection, as returned by _get(), or None.
+    @p hdrs (dict of str) Headers to add to each request.
+    @p decode (callable) Decodes the body of each page after @p page.
+    @return A generator of @p page followed by every page after it.
+    """
+    while page:
+      yield page
+      next_url = page['pages']['next_url'] if 'pages' in page else None
+      if not next_url:
+        return
+      # next_url is absolute, so urljoin in _get leaves it untouched.
+      page = self._get(next_url, hdrs=hdrs, decode=decode)
+
+  def _get(self, resource, params=None, hdrs=None, decode=loads):
     """
     @p resource (str) The REST resource to GET, appended to the base URL.
     @p params (dict of str) Parameterss to add to the request.
     @p hdrs (dict of str) Headers to add to the request. Authorization is added
       by default.
-    @return A requests.Response.json() object or None on error.
+    @p decode (callable) Decodes the response body.
+    @return The decoded response body or None on error.
+    """
+    data, record = self._request(resource, params=params, hdrs=hdrs)
+    return self._decode(data, record, decode) if data is not None else None
+
+  def _request(self, resource, params=None, hdrs=None):
+    """
+    Send a GET, waiting on the rate limiter and retrying on 429.
+
+    @p resource (str) The REST resource to GET, appended to the base URL.
+    @p params (dict of str) Parameters to add to the request.
+    @p hdrs (dict of str) Headers to add to the request. Authorization is added
+      by default.
+    @return (tuple) A requests.Response with a 2xx or 3xx status, or None on
+      error, and its instrument.RequestRecord. The caller must pass the record
+      to _decode() or _record(); failures are recorded here.
     """
     url = urljoin(self._base_url, resource)
     headers = {**(self._headers), **hdrs} if hdrs else self._headers
-    data = requests.get(url, params=params, headers=headers)
+
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+      self._rate_limiter.acquire()
+      data, record = timed_get(self._session.http(), url, resource,
+                               retries=attempt, params=params,
+                               headers=headers)
+      if data.status_code != 429 or attempt == RATE_LIMIT_RETRIES:
+        break
+      self._rate_limiter.defer(self._rate_limit_reset(data))
 
     if not data.ok:
       print('Request for resource {} failed; reason: {}'.format(resource,
         data.reason))
-      return None
+      self._record(record)
+      return None, None
+
+    return data, record
 
-    return data.json()
+  def _decode(self, response, record, decode=loads):
+    """
+    @p decode (callable) Decodes the body bytes.
+    @return The JSON body of @p response, recording its decode time.
+    """
+    data, record = timed_json(response, record, decode)
+    self._record(record)
+    return data
+
+  def _record(self, record):
+    if self._instrumentation is not None:
+      self._instrumentation.record(record)
+
+  @staticmethod
+  def _rate_limit_reset(response):
+    """
+    @p response (requests.Response) A 429 response.
+    @return (float) Seconds since the epoch at which the rate limit resets.
+    """
+    reset = response.headers.get('RateLimit-Reset')
+    try:
+      return float(reset)
+    except (TypeError, ValueError):
+      # Without a usable header, wait out one window.
+      return time.time() + REQUEST_WINDOW
@@ -0,0 +1,70 @@
+"""
+Pluggable JSON decoding for API responses. The fastest installed backend is
+used: msgspec, then orjson, then the standard library. With msgspec, subject
+pages can also be decoded straight from the response bytes into typed structs
+(see interface.structs), skipping the intermediate dicts entirely; the structs
+support the item access the Subject constructors use.
+"""
+
+import json
+
+try:
+  import msgspec
+except ImportError:
+  msgspec = None
+
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+
+def available_backends():
+  """
+  @return (list of str) The installed backends, fastest first.
+  """
+  backends = []
+  if msgspec is not None:
+    backends.append('msgspec')
+  if orjson is not None:
+    backends.append('orjson')
+  backends.append('json')
+  return backends
+
+
+DEFAULT_BACKEND = available_backends()[0]
+
+_LOADS = {
+  'msgspec': lambda data: msgspec.json.decode(data),
+  'orjson': lambda data: orjson.loads(data),
+  'json': lambda data: json.loads(data),
+}
+
+
+def loads(data, backend=None):
+  """
+  @p data (bytes) A UTF-8 JSON document, such as requests.Response.content.
+  @p backend (str) One of available_backends(); DEFAULT_BACKEND if None.
+  @return The decoded dicts, lists, and scalars.
+  """
+  return _LOADS[backend if backend else DEFAULT_BACKEND](data)
+
+
+def typed_subjects_available():
+  """
+  @return (bool) True if decode_subject_page() can decode into structs.
+  """
+  return msgspec is not None
+
+
+def decode_subject_page(data):
+  """
+  Decode a page of the subjects collection directly into typed structs.
+  Requires msgspec.
+
+  @p data (bytes) The response body.
+  @return (structs.SubjectPage) A page whose members, like those of a dict
+    page, are reachable as page['data'] and page['pages']['next_url'].
+  """
+  from interface.structs import SUBJECT_PAGE_DECODER
+  return SUBJECT_PAGE_DECODER.decode(data)
@@ -0,0 +1,71 @@
+"""
+A compact, lazily parsed alternative to the classes in interface.subjects.
+A LazySubject keeps a subject's JSON as UTF-8 bytes and only builds the full
+Radical, Kanji, or Vocabulary when a field beyond its ID, type, or level is
+read. This suits tools that hold the whole catalog but touch few subjects.
+"""
+
+import json
+
+from interface.subjects import Subjects, create_subject
+
+
+class LazySubject:
+  __slots__ = ('id', 'object', 'level', '_raw', '_subject')
+
+  def __init__(self, item):
+    """
+    @p item (dict) A subject JSON object retrieved through the WaniKani V2 API.
+      It is re-encoded compactly and not referenced afterwards.
+    """
+    self.id = item['id']
+    self.object = item['object']
+    self.level = item['data']['level']
+    self._raw = json.dumps(item, ensure_ascii=False,
+                           separators=(',', ':')).encode('utf-8')
+    self._subject = None
+
+  @property
+  def original_json(self):
+    """
+    @return (dict) A freshly decoded copy of this subject's JSON.
+    """
+    return json.loads(self._raw.decode('utf-8'))
+
+  def subject(self):
+    """
+    @return The Radical, Kanji, or Vocabulary for this subject, built on first
+      use and kept until release().
+    """
+    if self._subject is None:
+      self._subject = create_subject(self.original_json)
+    return self._subject
+
+  def release(self):
+    """
+    Drop the parsed subject, returning to the compact representation.
+    """
+    self._subject = None
+
+  def __getattr__(self, name):
+    # Only called for names not found in __slots__, i.e. parsed fields.
+    if name.startswith('_'):
+      raise AttributeError(name)
+    return getattr(self.subject(), name)
+
+  def __str__(self):
+    return str(self.subject())
+
+
+def lazy_subjects(items):
+  """
+  @p items (iterable of dict) Subject JSON objects, such as those yielded by
+    Interface.iter_subject_json().
+  @return A subjects.Subjects of LazySubject lists.
+  """
+  subjects = Subjects([], [], [])
+  collections = {'radical': subjects.radicals, 'kanji': subjects.kanji,
+                 'vocabulary': subjects.vocabulary}
+  for item in items:
+    collections[item['object']].append(LazySubject(item))
+  return subjects
@@ -0,0 +1,204 @@
+"""
+Lesson ordering that levels up as soon as possible.
+
+A level is passed when LEVEL_UP_FRACTION of its kanji reach Guru, and a kanji
+unlocks once all of its radicals have. From the SRS intervals and each
+subject's progress, the planner projects when every kanji on a level could
+reach Guru if all available lessons were taken now. The earliest of those
+kanji are the ones the level-up waits on. Working back from the projected
+level-up through them and their radicals gives each lesson on that critical
+path the latest time it can be taken without delaying the level-up. Lessons are
+ordered by that slack, least first, so whatever the pace of lessons, those
+holding up the level-up come first. The rest follow by type: radicals, then
+kanji, then vocabulary.
+
+Progress is kept per subject and updated from assignments as they change.
+Plans are cached per level and hour, since reviews fall on the hour, and an
+update only invalidates the plans of levels that depend on the subject.
+"""
+
+import math
+from collections import namedtuple
+
+from interface.srs import GURU_STAGE, hours_to_guru, intervals_for_level
+from interface.subjects import Radical, Kanji, Vocabulary
+from interface.time import (NO_TIME, datetime_to_epoch_us, epoch_us_to_datetime,
+                            utc_now)
+
+# The share of a level's kanji that must reach Guru to level up.
+LEVEL_UP_FRACTION = 0.9
+
+# An hour in microseconds, the unit of every time below.
+HOUR = 3600 * 10 ** 6
+
+# @p level_up_at (datetime) The projected level-up if the lessons are taken
+#   now, or None for a level without kanji. @p lessons (list of int) The
+#   subject IDs of the available lessons, in the order to take them.
+#   @p critical (frozenset of int) Those of @p lessons the level-up waits on.
+Plan = namedtuple('Plan', ['level', 'level_up_at', 'lessons', 'critical'])
+
+_TYPE_ORDER = {Radical: 0, Kanji: 1, Vocabulary: 2}
+
+
+class LessonPlanner:
+  def __init__(self, store):
+    """
+    @p store (store.SubjectStore) The subjects to plan, which must not change
+      while the planner is in use. Levels are planned from whatever of their
+      subjects and components it holds.
+    """
+    self._store = store
+    self._levels = sorted(set(subject.level for subject in store))
+    # Maps each subject ID with an assignment to its SRS stage and the epoch
+    # microseconds of its next review. Other subjects are locked.
+    self._progress = {}
+    # Maps each level to the hour it was planned in and its Plan.
+    self._plans = {}
+
+  def set_progress(self, subject_id, stage, available_at=NO_TIME):
+    """
+    Record the assignment of @p subject_id.
+
+    @p stage (int) The SRS stage; 0 if the lesson has not been taken.
+    @p available_at (int) The next review, in epoch microseconds, or NO_TIME.
+    """
+    self._progress[subject_id] = (stage, available_at)
+    self._invalidate(subject_id)
+
+  def lock(self, subject_id):
+    """
+    Forget the assignment of @p subject_id, e.g. because it was hidden.
+    """
+    if self._progress.pop(subject_id, None) is not None:
+      self._invalidate(subject_id)
+
+  def update(self, assignments):
+    """
+    @p assignments (columns.Assignments) Assignments as returned by
+      Interface.get_assignments(): all of them, or those updated since the
+      last call. Hidden assignments are locked.
+    """
+    for subject_id, stage, available_at, hidden in zip(
+        assignments.subject_id, assignments.srs_stage,
+        assignments.available_at, assignments.hidden):
+      if hidden or stage < 0:
+        self.lock(subject_id)
+      else:
+        self.set_progress(subject_id, stage, available_at)
+
+  def plan(self, level, now=None):
+    """
+    @p level (int) The level to plan, normally the user's current level.
+      Radicals without an assignment are planned as if their level had just
+      been reached, so later levels can be planned too.
+    @p now (datetime) The naive UTC time lessons start; the current time by
+      default. Plans are computed for the start of its hour.
+    @return (Plan) The order of @p level's lessons, along with any lessons on
+      lower levels its level-up waits on.
+    """
+    if now is None:
+      now = utc_now()
+    hour = datetime_to_epoch_us(now) // HOUR
+    cached = self._plans.get(level)
+    if cached is None or cached[0] != hour:
+      cached = (hour, self._plan(level, hour * HOUR))
+      self._plans[level] = cached
+    return cached[1]
+
+  def plans(self, now=None):
+    """
+    @return (list of Plan) A plan for every level in the store, in order.
+    """
+    if now is None:
+      now = utc_now()
+    return [self.plan(level, now) for level in self._levels]
+
+  def _plan(self, level, now):
+    store = self._store
+    subjects = store.by_level(level)
+    guru_at = {}
+    kanji = sorted((self._guru_at(subject, now, guru_at), subject.id, subject)
+                   for subject in subjects if isinstance(subject, Kanji))
+    needed = math.ceil(LEVEL_UP_FRACTION * len(kanji))
+    level_up = kanji[needed - 1][0] if needed else None
+
+    # The latest each lesson on the critical path can start.
+    latest = {}
+    for _, subject_id, subject in kanji[:needed]:
+      progress = self._progress.get(subject_id)
+      if progress is not None and progress[0] > 0:
+        continue
+      start = level_up - self._lesson_to_guru(subject)
+      if progress is not None:
+        latest[subject_id] = start
+        continue
+      # Locked until its radicals pass.
+      for radical in store.components(subject):
+        if self._is_lesson(radical):
+          start_radical = start - self._lesson_to_guru(radical)
+          latest[radical.id] = min(latest.get(radical.id, start_radical),
+                                   start_radical)
+
+    lessons = [subject for subject in subjects if self._is_lesson(subject)]
+    lessons.extend(store.get(subject_id) for subject_id in latest
+                   if store.get(subject_id).level != level)
+    lessons.sort(key=lambda subject: (latest.get(subject.id, math.inf),
+                                      _TYPE_ORDER[type(subject)], subject.id))
+    return Plan(level,
+                epoch_us_to_datetime(level_up) if needed else None,
+                [subject.id for subject in lessons], frozenset(latest))
+
+  def _is_lesson(self, subject):
+    """
+    @return (bool) True if @p subject's lesson can be taken: it has an
+      assignment that has not been started, or it is a radical without one.
+    """
+    progress = self._progress.get(subject.id)
+    if progress is None:
+      return isinstance(subject, Radical)
+    return progress[0] == 0
+
+  @staticmethod
+  def _lesson_to_guru(subject):
+    return hours_to_guru(0, intervals_for_level(subject.level)) * HOUR
+
+  def _guru_at(self, subject, now, guru_at):
+    """
+    @p guru_at (dict) Memoises projections for one plan.
+    @return (int) The earliest @p subject can reach Guru if every lesson
+      available is taken at @p now and every review is answered correctly
+      when due.
+    """
+    time = guru_at.get(subject.id)
+    if time is not None:
+      return time
+
+    progress = self._progress.get(subject.id)
+    if progress is None and not isinstance(subject, Radical):
+      # Unlocked once all of its components pass.
+      unlocked = max([self._guru_at(component, now, guru_at)
+                      for component in self._store.components(subject)] +
+                     [now])
+      time = unlocked + self._lesson_to_guru(subject)
+    elif progress is None or progress[0] == 0:
+      time = now + self._lesson_to_guru(subject)
+    elif progress[0] >= GURU_STAGE:
+      time = now
+    else:
+      intervals = intervals_for_level(subject.level)
+      time = max(progress[1], now) + \
+        hours_to_guru(progress[0], intervals) * HOUR
+    guru_at[subject.id] = time
+    return time
+
+  def _invalidate(self, subject_id):
+    """
+    Drop the cached plans that depend on @p subject_id: its level's, and
+    those of the levels of subjects built from it.
+    """
+    subject = self._store.get(subject_id)
+    if subject is None:
+      return
+    self._plans.pop(subject.level, None)
+    for amalgamation in self._store.amalgamations(subject):
+      self._plans.pop(amalgamation.level, None)
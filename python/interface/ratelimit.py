@@ -0,0 +1,63 @@
+"""
+This module provides request rate limiting for the WaniKani V2 API, which allows
+60 requests per minute per API token.
+"""
+
+import threading
+import time
+
+# The number of requests WaniKani allows per REQUEST_WINDOW seconds.
+REQUEST_LIMIT = 60
+REQUEST_WINDOW = 60.0
+
+
+class TokenBucket:
+  """
+  A thread-safe token bucket. Each request takes one token; tokens refill
+  continuously at capacity / window per second. The bucket can also be paused
+  until a wall-clock time, as instructed by a 429 response.
+  """
+
+  def __init__(self, capacity=REQUEST_LIMIT, window=REQUEST_WINDOW):
+    """
+    @p capacity (int) The maximum number of tokens, i.e. the allowed burst.
+    @p window (float) The number of seconds over which @p capacity tokens
+      refill.
+    """
+    self._capacity = float(capacity)
+    self._rate = capacity / window
+    self._tokens = float(capacity)
+    self._last = time.monotonic()
+    self._paused_until = 0.0  # Wall-clock seconds; see defer().
+    self._lock = threading.Lock()
+
+  def acquire(self):
+    """
+    Block until a token is available and take it.
+    """
+    while True:
+      with self._lock:
+        now = time.monotonic()
+        self._tokens = min(self._capacity,
+                           self._tokens + (now - self._last) * self._rate)
+        self._last = now
+
+        wait = self._paused_until - time.time()
+        if wait <= 0:
+          if self._tokens >= 1:
+            self._tokens -= 1
+            return
+          wait = (1 - self._tokens) / self._rate
+
+      time.sleep(wait)
+
+  def defer(self, until):
+    """
+    Hold every caller of acquire() until a point in time and drain the bucket,
+    since the server has told us our budget is spent.
+
+    @p until (float) Seconds since the epoch, as in a RateLimit-Reset header.
+    """
+    with self._lock:
+      self._paused_until = max(self._paused_until, until)
+      self._tokens = 0.0
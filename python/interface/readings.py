@@ -0,0 +1,237 @@
+"""
+Reading lookup with one key space for hiragana, katakana, and romaji input,
+and prefix queries for autocompletion.
+
+Readings are normalised to hiragana. The index keeps them as one sorted list,
+with the IDs of the subjects having each reading packed into a single integer
+array, so a prefix query is two binary searches and a slice, and the catalog
+takes about half the memory of a dict of lists. A trie or DAWG would share
+prefixes between keys, but in pure Python its nodes would cost far more memory
+than they save on strings this short.
+"""
+
+from array import array
+from bisect import bisect_left
+
+from interface.store import subject_readings
+
+# Romaji to hiragana: Hepburn, with the common Kunrei-shiki and Nihon-shiki
+# spellings and the x/l prefixes IMEs use for small kana.
+ROMAJI = {
+  'a': 'あ', 'i': 'い', 'u': 'う', 'e': 'え', 'o': 'お',
+  'ka': 'か', 'ki': 'き', 'ku': 'く', 'ke': 'け', 'ko': 'こ',
+  'ga': 'が', 'gi': 'ぎ', 'gu': 'ぐ', 'ge': 'げ', 'go': 'ご',
+  'sa': 'さ', 'shi': 'し', 'si': 'し', 'su': 'す', 'se': 'せ', 'so': 'そ',
+  'za': 'ざ', 'ji': 'じ', 'zi': 'じ', 'zu': 'ず', 'ze': 'ぜ', 'zo': 'ぞ',
+  'ta': 'た', 'chi': 'ち', 'ti': 'ち', 'tsu': 'つ', 'tu': 'つ',
+  'te': 'て', 'to': 'と',
+  'da': 'だ', 'di': 'ぢ', 'du': 'づ', 'de': 'で', 'do': 'ど',
+  'na': 'な', 'ni': 'に', 'nu': 'ぬ', 'ne': 'ね', 'no': 'の',
+  'ha': 'は', 'hi': 'ひ', 'fu': 'ふ', 'hu': 'ふ', 'he': 'へ', 'ho': 'ほ',
+  'ba': 'ば', 'bi': 'び', 'bu': 'ぶ', 'be': 'べ', 'bo': 'ぼ',
+  'pa': 'ぱ', 'pi': 'ぴ', 'pu': 'ぷ', 'pe': 'ぺ', 'po': 'ぽ',
+  'ma': 'ま', 'mi': 'み', 'mu': 'む', 'me': 'め', 'mo': 'も',
+  'ya': 'や', 'yu': 'ゆ', 'yo': 'よ',
+  'ra': 'ら', 'ri': 'り', 'ru': 'る', 're': 'れ', 'ro': 'ろ',
+  'wa': 'わ', 'wi': 'ゐ', 'we': 'ゑ', 'wo': 'を',
+  'nn': 'ん', "n'": 'ん',
+  'kya': 'きゃ', 'kyu': 'きゅ', 'kyo': 'きょ',
+  'gya': 'ぎゃ', 'gyu': 'ぎゅ', 'gyo': 'ぎょ',
+  'sha': 'しゃ', 'shu': 'しゅ', 'sho': 'しょ', 'she': 'しぇ',
+  'sya': 'しゃ', 'syu': 'しゅ', 'syo': 'しょ',
+  'ja': 'じゃ', 'ju': 'じゅ', 'jo': 'じょ', 'je': 'じぇ',
+  'jya': 'じゃ', 'jyu': 'じゅ', 'jyo': 'じょ',
+  'zya': 'じゃ', 'zyu': 'じゅ', 'zyo': 'じょ',
+  'cha': 'ちゃ', 'chu': 'ちゅ', 'cho': 'ちょ', 'che': 'ちぇ',
+  'tya': 'ちゃ', 'tyu': 'ちゅ', 'tyo': 'ちょ',
+  'dya': 'ぢゃ', 'dyu': 'ぢゅ', 'dyo': 'ぢょ',
+  'nya': 'にゃ', 'nyu': 'にゅ', 'nyo': 'にょ',
+  'hya': 'ひゃ', 'hyu': 'ひゅ', 'hyo': 'ひょ',
+  'bya': 'びゃ', 'byu': 'びゅ', 'byo': 'びょ',
+  'pya': 'ぴゃ', 'pyu': 'ぴゅ', 'pyo': 'ぴょ',
+  'mya': 'みゃ', 'myu': 'みゅ', 'myo': 'みょ',
+  'rya': 'りゃ', 'ryu': 'りゅ', 'ryo': 'りょ',
+  'fa': 'ふぁ', 'fi': 'ふぃ', 'fe': 'ふぇ', 'fo': 'ふぉ',
+  'xa': 'ぁ', 'xi': 'ぃ', 'xu': 'ぅ', 'xe': 'ぇ', 'xo': 'ぉ',
+  'la': 'ぁ', 'li': 'ぃ', 'lu': 'ぅ', 'le': 'ぇ', 'lo': 'ぉ',
+  'xya': 'ゃ', 'xyu': 'ゅ', 'xyo': 'ょ',
+  'lya': 'ゃ', 'lyu': 'ゅ', 'lyo': 'ょ',
+  'xtsu': 'っ', 'xtu': 'っ', 'ltsu': 'っ', 'ltu': 'っ',
+  '-': 'ー',
+}
+
+_LONGEST = max(len(key) for key in ROMAJI)
+_PREFIXES = set(key[:length] for key in ROMAJI
+                for length in range(1, len(key) + 1))
+_VOWELS = set('aiueo')
+
+# Katakana that have a hiragana counterpart sit 0x60 above it.
+_KATAKANA = {code: code - 0x60 for code in range(ord('ァ'), ord('ヶ') + 1)}
+
+
+def katakana_to_hiragana(text):
+  """
+  @return (str) @p text with its katakana replaced by hiragana. The long vowel
+    mark ー has no hiragana form and is kept.
+  """
+  return text.translate(_KATAKANA)
+
+
+def romaji_to_hiragana(text):
+  """
+  Convert the romaji in @p text to hiragana. Kana and other characters pass
+  through.
+
+  @return (tuple of str) The converted text, and any romaji at its end that is
+    the start of a syllable but not yet a whole one, e.g. 'sh' in 'kyoush'.
+    A lone 'n' at the end is left unconverted, since it may start な.
+  """
+  out = []
+  index = 0
+  while index < len(text):
+    character = text[index]
+    following = text[index + 1:index + 2]
+    # A doubled romaji consonant is a small っ before the syllable, as is the
+    # t of Hepburn's tch. Repeated kana, as in ここ, are left alone.
+    if (character == following and 'a' <= character <= 'z' and
+        character not in _VOWELS and character != 'n') or \
+       text[index:index + 3] == 'tch':
+      out.append('っ')
+      index += 1
+      continue
+    # An n before a consonant other than y is ん, as is the first n of nn
+    # before a vowel or y, where the second starts the next syllable: onna is
+    # おんな, not おんあ.
+    if character == 'n' and following and following not in _VOWELS and \
+       following not in "yn'" and following.isalpha():
+      out.append('ん')
+      index += 1
+      continue
+    if character == 'n' and following == 'n' and \
+       text[index + 2:index + 3] in _VOWELS | {'y'}:
+      out.append('ん')
+      index += 1
+      continue
+
+    for length in range(min(_LONGEST, len(text) - index), 0, -1):
+      kana = ROMAJI.get(text[index:index + length])
+      if kana:
+        out.append(kana)
+        index += length
+        break
+    else:
+      if text[index:] in _PREFIXES:
+        return ''.join(out), text[index:]
+      out.append(character)
+      index += 1
+  return ''.join(out), ''
+
+
+def normalize(text):
+  """
+  @p text (str) A reading in hiragana, katakana, or romaji.
+  @return (tuple of str) Its hiragana form, and an unfinished romaji syllable
+    at its end, if any; see romaji_to_hiragana().
+  """
+  return romaji_to_hiragana(katakana_to_hiragana(text.strip().casefold()))
+
+
+def to_key(text):
+  """
+  @return (str) The index key for the whole reading @p text. A trailing 'n'
+    is taken as ん.
+  """
+  kana, tail = normalize(text)
+  return kana + ('ん' if tail == 'n' else tail)
+
+
+class ReadingIndex:
+  def __init__(self, subjects=()):
+    """
+    @p subjects (iterable) Radical, Kanji, and Vocabulary instances. Radicals
+      have no readings and are skipped.
+    """
+    readings = {}
+    for subject in subjects:
+      for reading in subject_readings(subject):
+        readings.setdefault(to_key(reading), set()).add(subject.id)
+
+    # Sorted keys, and per key a run of IDs in one array: the IDs of
+    # self._keys[i] are self._ids[self._offsets[i]:self._offsets[i + 1]].
+    self._keys = sorted(readings)
+    self._offsets = array('l', [0])
+    self._ids = array('l')
+    for key in self._keys:
+      self._ids.extend(sorted(readings[key]))
+      self._offsets.append(len(self._ids))
+
+  @classmethod
+  def from_subjects(cls, subjects):
+    """
+    @p subjects (subjects.Subjects) As returned by Interface.get_subjects().
+    @return A ReadingIndex over every subject in @p subjects.
+    """
+    return cls(subject for collection in subjects for subject in collection)
+
+  def __len__(self):
+    """
+    @return (int) The number of distinct readings.
+    """
+    return len(self._keys)
+
+  def lookup(self, reading):
+    """
+    @p reading (str) A whole reading, in hiragana, katakana, or romaji.
+    @return (list of int) The IDs of the subjects with @p reading, ascending.
+    """
+    key = to_key(reading)
+    index = bisect_left(self._keys, key)
+    if index < len(self._keys) and self._keys[index] == key:
+      return self._ids[self._offsets[index]:self._offsets[index + 1]].tolist()
+    return []
+
+  def prefix(self, text, limit=None):
+    """
+    @p text (str) The start of a reading, in hiragana, katakana, or romaji. An
+      unfinished romaji syllable matches every syllable it could become.
+    @p limit (int) The maximum number of IDs to return; all if None.
+    @return (list of int) The IDs of the subjects with a reading starting with
+      @p text, ascending.
+    """
+    ids = set()
+    for start, end in self._ranges(text):
+      ids.update(self._ids[self._offsets[start]:self._offsets[end]])
+    return sorted(ids)[:limit]
+
+  def completions(self, text, limit=None):
+    """
+    @return (list of str) The readings, in hiragana, that start with @p text,
+      in order.
+    """
+    keys = []
+    for start, end in self._ranges(text):
+      keys.extend(self._keys[start:end])
+    return sorted(set(keys))[:limit]
+
+  def _ranges(self, text):
+    """
+    @return (list of tuple of int) The [start, end) ranges of self._keys
+      starting with any of the kana @p text could be the start of.
+    """
+    kana, tail = normalize(text)
+    if tail:
+      prefixes = set(kana + syllable for romaji, syllable in ROMAJI.items()
+                     if romaji.startswith(tail))
+      # A prefix that extends another adds nothing to the other's range.
+      prefixes = [prefix for prefix in prefixes if not any(
+        prefix != other and prefix.startswith(other) for other in prefixes)]
+    else:
+      prefixes = [kana]
+
+    ranges = []
+    for prefix in prefixes:
+      # Every key starting with prefix sorts before prefix followed by the
+      # highest code point.
+      ranges.append((bisect_left(self._keys, prefix),
+                     bisect_left(self._keys, prefix + '\U0010ffff')))
+    return ranges
@@ -0,0 +1,332 @@
+"""
+A full-text inverted index over subjects' meanings, mnemonics, and context
+sentences. English is split into casefolded word tokens; Japanese, which has no
+spaces to split on, is indexed as character unigrams and bigrams, so any
+substring can be looked up. Results are ranked by how rare the matched terms
+are and how important the fields they matched in are.
+
+Meanings are matched with some tolerance for typos: a query word that names no
+meaning is also tried as the meaning words within a small edit distance of it.
+
+The index saves to and loads from a JSON file, so queries need no catalog and
+no rebuild.
+"""
+
+import json
+import math
+import re
+from collections import defaultdict, namedtuple
+
+from interface.subjects import Vocabulary
+
+# Indexed fields and the weight of a match in each.
+FIELDS = (
+  ('characters', 8.0),
+  ('meanings', 8.0),
+  ('aux_meanings', 4.0),
+  ('sentences', 2.0),
+  ('meaning_mnemonic', 1.0),
+  ('reading_mnemonic', 1.0),
+)
+FIELD_NAMES = tuple(name for name, _ in FIELDS)
+_WEIGHTS = tuple(weight for _, weight in FIELDS)
+_MEANING_FIELDS = (FIELD_NAMES.index('meanings'),
+                   FIELD_NAMES.index('aux_meanings'))
+
+# A typo-tolerant match scores this fraction of an exact one.
+FUZZY_PENALTY = 0.5
+# The most typos tolerated in any query word; see max_typos().
+MAX_TYPOS = 2
+
+FORMAT_VERSION = 1
+
+SearchResult = namedtuple('SearchResult', ['id', 'object', 'characters',
+                                           'meaning', 'score'])
+
+# Mnemonics mark up subjects they mention, e.g. <radical>ground</radical>.
+_MARKUP = re.compile(r'<[^>]*>')
+_ENGLISH = re.compile(r"[0-9a-z]+(?:'[a-z]+)?")
+_JAPANESE = re.compile('[\u3005\u3006\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff'
+                       '\uf900-\ufaff]+')
+
+
+def tokenize(text):
+  """
+  @p text (str) English, Japanese, or both.
+  @return (list of str) The terms of @p text, as indexed: English words and
+    Japanese character unigrams and bigrams.
+  """
+  text = _MARKUP.sub(' ', text).casefold()
+  terms = _ENGLISH.findall(text)
+  for run in _JAPANESE.findall(text):
+    terms.extend(run)
+    terms.extend(run[index:index + 2] for index in range(len(run) - 1))
+  return terms
+
+
+def query_terms(text):
+  """
+  @return (list of str) The terms a query for @p text must all match: its
+    English words, and its Japanese as bigrams, or a unigram if only one
+    character long. Duplicates are dropped.
+  """
+  text = _MARKUP.sub(' ', text).casefold()
+  terms = _ENGLISH.findall(text)
+  for run in _JAPANESE.findall(text):
+    if len(run) == 1:
+      terms.append(run)
+    terms.extend(run[index:index + 2] for index in range(len(run) - 1))
+  return list(dict.fromkeys(terms))
+
+
+def edit_distance(a, b, limit):
+  """
+  @return (int) The optimal string alignment distance between @p a and @p b
+    (Levenshtein with transpositions), or @p limit + 1 if it exceeds @p limit.
+  """
+  if abs(len(a) - len(b)) > limit:
+    return limit + 1
+  previous2 = None
+  previous = list(range(len(b) + 1))
+  for i in range(1, len(a) + 1):
+    current = [i] + [0] * len(b)
+    for j in range(1, len(b) + 1):
+      cost = 0 if a[i - 1] == b[j - 1] else 1
+      current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                       previous[j - 1] + cost)
+      if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+        current[j] = min(current[j], previous2[j - 2] + 1)
+    if min(current) > limit:
+      return limit + 1
+    previous2, previous = previous, current
+  return previous[-1]
+
+
+def max_typos(term):
+  """
+  @return (int) The number of typos tolerated in a query word as long as
+    @p term: none for short words, where a typo usually makes another word,
+    and at most MAX_TYPOS.
+  """
+  if len(term) < 4:
+    return 0
+  return 1 if len(term) < 8 else MAX_TYPOS
+
+
+def _phrase(text):
+  return ' '.join(_ENGLISH.findall(_MARKUP.sub(' ', text).casefold()))
+
+
+def _deletes(term, depth):
+  """
+  @return (set of str) The strings left by deleting from one to @p depth
+    characters of @p term.
+  """
+  deletes = set()
+  frontier = {term}
+  for _ in range(depth):
+    frontier = set(text[:index] + text[index + 1:] for text in frontier
+                   for index in range(len(text)))
+    deletes |= frontier
+  return deletes
+
+
+class SearchIndex:
+  def __init__(self, subjects=()):
+    """
+    @p subjects (iterable) Radical, Kanji, and Vocabulary instances.
+    """
+    # Maps each term to a flat list of (subject ID, field index, count)
+    # triples, which serialise compactly.
+    self._postings = defaultdict(list)
+    # Maps each subject ID to its (object, characters, primary meaning).
+    self._documents = {}
+    self._meaning_terms = set()
+    # Built on the first typo-tolerant lookup; see _similar_terms().
+    self._deletes = None
+
+    for subject in subjects:
+      self.add(subject)
+
+  @classmethod
+  def from_subjects(cls, subjects):
+    """
+    @p subjects (subjects.Subjects) As returned by Interface.get_subjects().
+    @return A SearchIndex over every subject in @p subjects.
+    """
+    index = cls()
+    for collection in subjects:
+      for subject in collection:
+        index.add(subject)
+    return index
+
+  def __len__(self):
+    return len(self._documents)
+
+  def add(self, subject):
+    """
+    Index @p subject, which must not be indexed already.
+    """
+    self._documents[subject.id] = (type(subject).__name__.lower(),
+                                   subject.characters,
+                                   subject.meanings[0] if subject.meanings
+                                   else '')
+    # Subject stores the placeholder 'None' when there are no auxiliary
+    # meanings.
+    aux_meanings = [] if subject.aux_meanings == ['None'] \
+      else subject.aux_meanings
+    texts = {
+      'characters': [subject.characters],
+      'meanings': subject.meanings,
+      'aux_meanings': aux_meanings,
+      'meaning_mnemonic': [subject.meaning_mnemonic],
+      'reading_mnemonic': [getattr(subject, 'reading_mnemonic', '')],
+      'sentences': [text for sentence in subject.sentences
+                    for text in sentence]
+        if isinstance(subject, Vocabulary) else [],
+    }
+
+    for field, name in enumerate(FIELD_NAMES):
+      counts = defaultdict(int)
+      for text in texts[name]:
+        for term in tokenize(text):
+          counts[term] += 1
+        if field in _MEANING_FIELDS:
+          # Whole multi-word meanings are terms too, so exact meanings rank
+          # first. Words never contain spaces, so the two cannot collide.
+          phrase = _phrase(text)
+          if ' ' in phrase:
+            counts[phrase] += 1
+      for term, count in counts.items():
+        self._postings[term].extend((subject.id, field, count))
+        if field in _MEANING_FIELDS and ' ' not in term:
+          self._meaning_terms.add(term)
+          self._deletes = None
+
+  def search(self, query, limit=10, fields=None, fuzzy=True):
+    """
+    Find the subjects matching every term of @p query.
+
+    @p query (str) English words, Japanese text, or both.
+    @p limit (int) The maximum number of results.
+    @p fields (iterable of str) Only match in these of FIELD_NAMES; all of
+      them if None.
+    @p fuzzy (bool) If True, query words with no exact match in meanings are
+      matched against similar meaning words.
+    @return (list of SearchResult) The best matches first.
+    """
+    wanted = None
+    if fields is not None:
+      wanted = set(FIELD_NAMES.index(name) for name in fields)
+
+    meaning_fields = set(_MEANING_FIELDS)
+    if wanted is not None:
+      meaning_fields &= wanted
+
+    scores = None
+    for term in query_terms(query):
+      term_scores = self._score(term, wanted, 1.0)
+      if fuzzy and meaning_fields and term not in self._meaning_terms:
+        for similar in self._similar_terms(term):
+          for subject_id, score in self._score(similar, meaning_fields,
+                                               FUZZY_PENALTY).items():
+            if score > term_scores.get(subject_id, 0.0):
+              term_scores[subject_id] = score
+
+      if scores is None:
+        scores = term_scores
+      else:
+        scores = {subject_id: score + term_scores[subject_id]
+                  for subject_id, score in scores.items()
+                  if subject_id in term_scores}
+      if not scores:
+        return []
+
+    if not scores:
+      return []
+    phrase = _phrase(query)
+    if ' ' in phrase and meaning_fields:
+      for subject_id, score in self._score(phrase, meaning_fields,
+                                           1.0).items():
+        if subject_id in scores:
+          scores[subject_id] += score
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return [SearchResult(subject_id, *self._documents[subject_id], score)
+            for subject_id, score in ranked[:limit]]
+
+  def _score(self, term, fields, factor):
+    """
+    @return (dict of int to float) The score of @p term in each subject it
+      occurs in, counting only @p fields (a set of field indices, or None for
+      all).
+    """
+    postings = self._postings.get(term)
+    if not postings:
+      return {}
+    # Rarer terms say more; len(postings) // 3 approximates the document
+    # frequency, counting a subject once per field.
+    idf = math.log(1 + len(self._documents) / (len(postings) // 3)) * factor
+    scores = defaultdict(float)
+    for index in range(0, len(postings), 3):
+      field = postings[index + 1]
+      if fields is None or field in fields:
+        scores[postings[index]] += idf * _WEIGHTS[field] * \
+          (1 + math.log(postings[index + 2]))
+    return scores
+
+  def _similar_terms(self, term):
+    """
+    @return (list of str) Meaning words within max_typos() of @p term.
+    """
+    limit = max_typos(term)
+    if not limit:
+      return []
+    if self._deletes is None:
+      # Symmetric deletion: two words within n edits of each other share a
+      # variant left by deleting at most n characters from each (counting
+      # the words themselves), so candidates are found by hash lookups and
+      # only verified by distance.
+      self._deletes = defaultdict(list)
+      for known in self._meaning_terms:
+        self._deletes[known].append(known)
+        for deleted in _deletes(known, MAX_TYPOS):
+          self._deletes[deleted].append(known)
+
+    candidates = set(self._deletes.get(term, ()))
+    for deleted in _deletes(term, limit):
+      candidates.update(self._deletes.get(deleted, ()))
+    return sorted(candidate for candidate in candidates
+                  if edit_distance(term, candidate, limit) <= limit)
+
+  def save(self, path):
+    """
+    Write the index to @p path as JSON.
+    """
+    with open(path, 'w', encoding='utf-8') as out:
+      json.dump({
+        'version': FORMAT_VERSION,
+        'fields': FIELD_NAMES,
+        'documents': self._documents,
+        'meaning_terms': sorted(self._meaning_terms),
+        'postings': self._postings,
+      }, out, ensure_ascii=False, separators=(',', ':'))
+
+  @classmethod
+  def load(cls, path):
+    """
+    @p path (str) A file written by save().
+    @return A SearchIndex equal to the one saved.
+    """
+    with open(path, encoding='utf-8') as source:
+      saved = json.load(source)
+    if saved.get('version') != FORMAT_VERSION or \
+       tuple(saved['fields']) != FIELD_NAMES:
+      raise ValueError('{} is not a search index in the current format'.format(
+        path))
+
+    index = cls()
+    index._documents = {int(subject_id): tuple(document)
+                        for subject_id, document in saved['documents'].items()}
+    index._meaning_terms = set(saved['meaning_terms'])
+    index._postings = defaultdict(list, saved['postings'])
+    return index
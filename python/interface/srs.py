@@ -0,0 +1,33 @@
+"""
+WaniKani's spaced repetition system (SRS) timings, shared by the review
+forecasts and the lesson planner.
+"""
+
+# Hours from reaching a stage until the next review, indexed by stage, for
+# WaniKani's standard SRS. Stage 0 is unstarted and 9 is burned; neither is
+# reviewed.
+STANDARD_INTERVALS = (0, 4, 8, 23, 47, 167, 335, 719, 2879, 0)
+# The accelerated SRS used for levels 1 and 2.
+ACCELERATED_INTERVALS = (0, 2, 4, 8, 23, 167, 335, 719, 2879, 0)
+ACCELERATED_LEVELS = (1, 2)
+
+# A subject at or above this stage is passed (Guru). Passing a level's kanji
+# levels up, and passing a kanji's radicals unlocks it.
+GURU_STAGE = 5
+
+
+def intervals_for_level(level):
+  """
+  @return (tuple of int) The SRS intervals of subjects on @p level.
+  """
+  return ACCELERATED_INTERVALS if level in ACCELERATED_LEVELS \
+    else STANDARD_INTERVALS
+
+
+def hours_to_guru(stage, intervals=STANDARD_INTERVALS):
+  """
+  @p stage (int) A stage below GURU_STAGE; 0 for a lesson not yet taken.
+  @return (int) The hours from the next review of a subject at @p stage (or
+    from its lesson) until it reaches Guru, if every answer is correct.
+  """
+  return sum(intervals[stage + 1:GURU_STAGE])
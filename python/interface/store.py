@@ -0,0 +1,216 @@
+"""
+An indexed, in-memory collection of subjects. A SubjectStore answers lookups by
+ID, characters, meaning, reading, and level with a hash lookup, and resolves the
+component/amalgamation relationships between subjects into a graph that can be
+walked one dictionary lookup per hop.
+"""
+
+from collections import defaultdict, deque
+
+from interface.lazy import LazySubject
+from interface.subjects import (SUBJECT_CLASSES, Subjects, Radical, Kanji,
+                                Vocabulary)
+
+
+def subject_class(subject):
+  """
+  @return (type) Radical, Kanji, or Vocabulary: the class of @p subject, or
+    for a lazy.LazySubject, the class of the subject it stands for.
+  """
+  if isinstance(subject, LazySubject):
+    return SUBJECT_CLASSES[subject.object]
+  return type(subject)
+
+
+def subject_readings(subject):
+  """
+  @return (list of str) Every reading of @p subject; empty for radicals.
+  """
+  subject_type = subject_class(subject)
+  if subject_type is Kanji:
+    return subject.readings.onyomi + subject.readings.kunyomi + \
+      subject.readings.nanori
+  if subject_type is Vocabulary:
+    return subject.readings
+  return []
+
+
+def subject_meanings(subject):
+  """
+  @return (list of str) Every meaning and auxiliary meaning of @p subject.
+  """
+  # Subject stores the placeholder 'None' when there are no auxiliary meanings.
+  if subject.aux_meanings == ['None']:
+    return subject.meanings
+  return subject.meanings + subject.aux_meanings
+
+
+class SubjectStore:
+  def __init__(self, subjects=()):
+    """
+    @p subjects (iterable) Radical, Kanji, and Vocabulary instances, or
+      lazy.LazySubject instances standing for them.
+    """
+    self._by_id = {}
+    self._by_type = {Radical: [], Kanji: [], Vocabulary: []}
+    self._by_characters = defaultdict(list)
+    self._by_meaning = defaultdict(list)
+    self._by_reading = defaultdict(list)
+    self._by_level = defaultdict(list)
+
+    for subject in subjects:
+      self.add(subject)
+
+  @classmethod
+  def from_subjects(cls, subjects):
+    """
+    @p subjects (subjects.Subjects) As returned by Interface.get_subjects().
+    @return A SubjectStore holding every subject in @p subjects.
+    """
+    store = cls()
+    for collection in subjects:
+      for subject in collection:
+        store.add(subject)
+    return store
+
+  def add(self, subject):
+    """
+    Index @p subject. A subject with an ID already present replaces it.
+    """
+    if subject.id in self._by_id:
+      self.remove(subject.id)
+
+    self._by_id[subject.id] = subject
+    self._by_type[subject_class(subject)].append(subject)
+    if subject.characters:
+      self._by_characters[subject.characters].append(subject)
+    for meaning in subject_meanings(subject):
+      self._by_meaning[meaning.casefold()].append(subject)
+    for reading in subject_readings(subject):
+      self._by_reading[reading].append(subject)
+    self._by_level[subject.level].append(subject)
+
+  def remove(self, subject_id):
+    """
+    Drop the subject with @p subject_id from every index. This is a linear
+    operation and is meant for occasional updates.
+    """
+    subject = self._by_id.pop(subject_id)
+    self._by_type[subject_class(subject)].remove(subject)
+    for index, keys in ((self._by_characters, (subject.characters,)),
+                        (self._by_meaning, (meaning.casefold() for meaning
+                                            in subject_meanings(subject))),
+                        (self._by_reading, subject_readings(subject)),
+                        (self._by_level, (subject.level,))):
+      for key in keys:
+        if subject in index.get(key, ()):
+          index[key].remove(subject)
+          if not index[key]:
+            del index[key]
+
+  def __len__(self):
+    return len(self._by_id)
+
+  def __iter__(self):
+    return iter(self._by_id.values())
+
+  def __contains__(self, subject_id):
+    return subject_id in self._by_id
+
+  @property
+  def radicals(self):
+    return self._by_type[Radical]
+
+  @property
+  def kanji(self):
+    return self._by_type[Kanji]
+
+  @property
+  def vocabulary(self):
+    return self._by_type[Vocabulary]
+
+  def to_subjects(self):
+    """
+    @return (subjects.Subjects) The stored subjects, each list in ID order.
+    """
+    key = lambda subject: subject.id
+    return Subjects(sorted(self.radicals, key=key), sorted(self.kanji, key=key),
+                    sorted(self.vocabulary, key=key))
+
+  def get(self, subject_id):
+    """
+    @return The subject with @p subject_id, or None.
+    """
+    return self._by_id.get(subject_id)
+
+  def by_characters(self, characters):
+    """
+    @return (list) Subjects written exactly as @p characters. A kanji and a
+      vocabulary item may share characters.
+    """
+    return list(self._by_characters.get(characters, ()))
+
+  def by_meaning(self, meaning):
+    """
+    @return (list) Subjects with @p meaning as a meaning or auxiliary meaning,
+      compared case-insensitively.
+    """
+    return list(self._by_meaning.get(meaning.casefold(), ()))
+
+  def by_reading(self, reading):
+    """
+    @return (list) Kanji and vocabulary with the kana @p reading.
+    """
+    return list(self._by_reading.get(reading, ()))
+
+  def by_level(self, level):
+    """
+    @return (list) Subjects on @p level.
+    """
+    return list(self._by_level.get(level, ()))
+
+  def components(self, subject):
+    """
+    @return (list) The stored subjects @p subject is built from: a kanji's
+      radicals or a vocabulary item's kanji.
+    """
+    return self._resolve(subject.component_ids)
+
+  def amalgamations(self, subject):
+    """
+    @return (list) The stored subjects built from @p subject: a radical's
+      kanji or a kanji's vocabulary.
+    """
+    return self._resolve(subject.amalgamation_ids)
+
+  def walk_components(self, subject):
+    """
+    @return A generator of every subject @p subject transitively depends on,
+      nearest first; e.g. a vocabulary item's kanji, then their radicals.
+    """
+    return self._walk(subject, self.components)
+
+  def walk_amalgamations(self, subject):
+    """
+    @return A generator of every subject transitively built from @p subject,
+      nearest first; e.g. a radical's kanji, then their vocabulary.
+    """
+    return self._walk(subject, self.amalgamations)
+
+  def _resolve(self, subject_ids):
+    # IDs outside this store, e.g. on levels that were not fetched, are
+    # skipped.
+    by_id = self._by_id
+    return [by_id[subject_id] for subject_id in subject_ids
+            if subject_id in by_id]
+
+  @staticmethod
+  def _walk(subject, neighbours):
+    seen = {subject.id}
+    queue = deque((subject,))
+    while queue:
+      for neighbour in neighbours(queue.popleft()):
+        if neighbour.id not in seen:
+          seen.add(neighbour.id)
+          queue.append(neighbour)
+          yield neighbour
@@ -0,0 +1,85 @@
+"""
+msgspec structs mirroring the parts of the subjects collection the toolkit
+reads. Decoding into these skips building dicts for every subject and every
+nested meaning, reading, and sentence, and ignores unused members outright.
+Requires msgspec, and so Python 3.8+.
+"""
+
+from typing import List, Optional
+
+import msgspec
+
+
+class Mapping(msgspec.Struct):
+  """
+  Lets a struct stand in for the dict it replaces, so code written against
+  decoded JSON, such as the Subject constructors, accepts it unchanged.
+  """
+
+  def __getitem__(self, key):
+    try:
+      return getattr(self, key)
+    except AttributeError:
+      raise KeyError(key)
+
+  def __contains__(self, key):
+    return hasattr(self, key)
+
+  def get(self, key, default=None):
+    return getattr(self, key, default)
+
+
+class Meaning(Mapping):
+  meaning: str
+
+
+class Reading(Mapping):
+  reading: str
+  type: Optional[str] = None
+
+
+class ContextSentence(Mapping):
+  en: str
+  ja: str
+
+
+class CharacterImage(Mapping):
+  url: str
+  content_type: str
+  metadata: dict = {}
+
+
+class SubjectData(Mapping):
+  level: int
+  document_url: str
+  meaning_mnemonic: str
+  meanings: List[Meaning]
+  auxiliary_meanings: List[Meaning] = []
+  characters: Optional[str] = None
+  character_images: List[CharacterImage] = []
+  readings: List[Reading] = []
+  reading_mnemonic: str = ''
+  parts_of_speech: List[str] = []
+  context_sentences: List[ContextSentence] = []
+  component_subject_ids: List[int] = []
+  amalgamation_subject_ids: List[int] = []
+  visually_similar_subject_ids: List[int] = []
+
+
+class SubjectResource(Mapping):
+  id: int
+  object: str
+  data: SubjectData
+  data_updated_at: Optional[str] = None
+
+
+class Pages(Mapping):
+  next_url: Optional[str] = None
+
+
+class SubjectPage(Mapping):
+  data: List[SubjectResource]
+  pages: Optional[Pages] = None
+
+
+SUBJECT_PAGE_DECODER = msgspec.json.Decoder(SubjectPage)
@@ -15,6 +15,11 @@ class Subject:
   A base class for WaniKani subjects.
   """
 
+  # Subjects are held by the thousand, so avoid a per-instance __dict__.
+  __slots__ = ('characters', 'original_json', 'id', 'document_url', 'level',
+               'meanings', 'aux_meanings', 'meaning_mnemonic',
+               'component_ids', 'amalgamation_ids', 'updated_at')
+
   # Use a tab to separate fields as it's far more likely WaniKani will use
   # commas or semicolons in their content than tabs.
   ANKI_SEPARATOR = '\t'
@@ -38,6 +43,12 @@ class Subject:
     self.meanings = []
     self.aux_meanings = []
     self.meaning_mnemonic = data['meaning_mnemonic']
+    # Schema-ignored. The subjects this one is built from and those built from
+    # it; radicals have no components and vocabulary has no amalgamations.
+    self.component_ids = tuple(data.get('component_subject_ids', ()))
+    self.amalgamation_ids = tuple(data.get('amalgamation_subject_ids', ()))
+    # Schema-ignored. The WaniKani timestamp of this subject's last change.
+    self.updated_at = item.get('data_updated_at')
 
     for meaning in data['meanings']:
       self.meanings.append(meaning['meaning'])
@@ -51,16 +62,21 @@ class Subject:
     """
     @return (str) a tab-separated list of our members.
     """
+    s = self.ANKI_SEPARATOR.join(self.anki_fields())
+    return s.replace('\r\n', ' ')
+
+  def anki_fields(self):
+    """
+    @return (tuple of str) Our members, unescaped, in the order of
+      anki_schema().
+    """
     # Some of our members are lists that will be joined by commas. Anki uses
     # the first (comma, semicolon, tab) it sees as the separator. Therefore,
     # the first member we add to the string should not itself contain any
     # character that can be confused as a separator.
-    s = self.ANKI_SEPARATOR.join((str(self.id), self.document_url,
-                                  str(self.level),
-                                  ', '.join(self.meanings),
-                                  ', '.join(self.aux_meanings),
-                                  self.meaning_mnemonic))
-    return s.replace('\r\n', ' ')
+    return (str(self.id), self.document_url, str(self.level),
+            ', '.join(self.meanings), ', '.join(self.aux_meanings),
+            self.meaning_mnemonic)
 
   def as_characters(self):
       """
@@ -77,6 +93,14 @@ class Subject:
 
 
 class Radical(Subject):
+  # Image-only radicals have no characters. image_url is their preferred
+  # character image; image_file, once set by interface.assets, is the name
+  # of its local copy, which the Anki export refers to.
+  __slots__ = ('image_url', 'image_file')
+
+  # The character image formats we can show.
+  IMAGE_TYPES = ('image/svg+xml', 'image/png')
+
   def __init__(self, item, store_json):
     """
     @p item (dict) A dictionary of the JSON radical object retrieved through
@@ -87,15 +111,40 @@ class Radical(Subject):
     # the order in which our members are written out in the Anki schema.
 
     super().__init__(item, store_json)
-    self.characters = ''  # TODO(orphen) Store the radical's vector graphic.
+    data = item['data']
+    self.characters = data['characters'] or ''
+    image = self.preferred_image(data.get('character_images') or ())
+    self.image_url = image['url'] if image else None
+    self.image_file = None
 
-  def to_anki(self):
+  @classmethod
+  def preferred_image(cls, images):
     """
-    @return (str) a tab-separated list of our members.
+    @p images (list of dict) A radical's character_images.
+    @return (dict) The image to show: an SVG, since it scales, and preferably
+      one with inline styles, since it renders without WaniKani's stylesheet;
+      otherwise the largest PNG. None if there is no usable image.
     """
-    anki = super().to_anki()
-    s = self.ANKI_SEPARATOR.join((anki, 'characters_not_implemented'))
-    return s.replace('\r\n', ' ')
+    def rank(image):
+      metadata = image.get('metadata') or {}
+      if image['content_type'] == 'image/svg+xml':
+        return (1, bool(metadata.get('inline_styles')))
+      dimensions = str(metadata.get('dimensions', '0x0')).partition('x')[0]
+      return (0, int(dimensions) if dimensions.isdigit() else 0)
+
+    usable = [image for image in images
+              if image['content_type'] in cls.IMAGE_TYPES]
+    return max(usable, key=rank) if usable else None
+
+  def anki_fields(self):
+    """
+    @return (tuple of str) Our members, unescaped, in the order of
+      anki_schema(). Image-only radicals show their image if it was fetched.
+    """
+    characters = self.characters
+    if not characters and self.image_file:
+      characters = '<img src="{}">'.format(self.image_file)
+    return super().anki_fields() + (characters,)
 
   @staticmethod
   def anki_schema():
@@ -111,16 +160,21 @@ class Radical(Subject):
 
 class Kanji(Subject):
   class Readings:
+    __slots__ = ('onyomi', 'kunyomi', 'nanori')
+
     def __init__(self):
       self.onyomi = list()
       self.kunyomi = list()
       self.nanori = list()
 
     def to_anki(self):
+      return Kanji.ANKI_SEPARATOR.join(self.anki_fields())
+
+    def anki_fields(self):
       onyomi = ', '.join(self.onyomi) if len(self.onyomi) else 'None'
       kunyomi = ', '.join(self.kunyomi) if len(self.kunyomi) else 'None'
       nanori = ', '.join(self.nanori) if len(self.nanori) else 'None'
-      return Kanji.ANKI_SEPARATOR.join((onyomi, kunyomi, nanori))
+      return (onyomi, kunyomi, nanori)
 
     @staticmethod
     def anki_schema():
@@ -130,6 +184,7 @@ class Kanji(Subject):
       return 'O: {}; K: {}; N: {}'.format(', '.join(self.onyomi),
         ', '.join(self.kunyomi), ', '.join(self.nanori))
 
+  __slots__ = ('readings', 'reading_mnemonic', 'visually_similar_ids')
 
   def __init__(self, item, store_json):
     """
@@ -147,6 +202,10 @@ class Kanji(Subject):
     self.characters = data['characters']
     self.readings = self.Readings()
     self.reading_mnemonic = data['reading_mnemonic']
+    # Schema-ignored. The kanji WaniKani considers easily confused with this
+    # one.
+    self.visually_similar_ids = tuple(
+      data.get('visually_similar_subject_ids', ()))
 
     for reading in data['readings']:
       if reading['type'] == 'onyomi':
@@ -157,15 +216,13 @@ class Kanji(Subject):
         self.readings.nanori.append(reading['reading'])
 
 
-  def to_anki(self):
+  def anki_fields(self):
     """
-    @return (str) a tab-separated list of our members.
+    @return (tuple of str) Our members, unescaped, in the order of
+      anki_schema().
     """
-    anki = super().to_anki()
-    s = self.ANKI_SEPARATOR.join((anki, self.characters,
-                                  self.readings.to_anki(),
-                                  self.reading_mnemonic))
-    return s.replace('\r\n', ' ')
+    return super().anki_fields() + (self.characters,) + \
+      self.readings.anki_fields() + (self.reading_mnemonic,)
 
   @staticmethod
   def anki_schema():
@@ -181,8 +238,14 @@ class Kanji(Subject):
                              str(self.readings), self.level, self.id)
 
 
+# A vocabulary context sentence. Defined at module level so it can be pickled.
+Sentence = namedtuple('Sentence', ['en', 'ja'])
+
+
 class Vocabulary(Subject):
-  Sentence = namedtuple('Sentence', ['en', 'ja'])
+  Sentence = Sentence
+
+  __slots__ = ('readings', 'parts_of_speech', 'reading_mnemonic', 'sentences')
 
 
   def __init__(self, item, store_json):
@@ -215,25 +278,18 @@ class Vocabulary(Subject):
       self.sentences.append(self.Sentence(sentence['en'].rstrip('\n'),
                                           sentence['ja'].rstrip('\n')))
 
-  def to_anki(self):
+  def anki_fields(self):
     """
-    @return (str) a tab-separated list of our members.
+    @return (tuple of str) Our members, unescaped, in the order of
+      anki_schema().
     """
-    sentences = ''
-    first = True
-    for sentence in self.sentences:
-      if not first:
-        sentences += '<br>'
-      first = False
-      sentences += '<br>'.join((sentence.en, sentence.ja))
-
-    anki = super().to_anki()
-    s = self.ANKI_SEPARATOR.join((anki, self.characters,
-                                  ', '.join(self.readings),
-                                  ', '.join(self.parts_of_speech),
-                                  self.reading_mnemonic,
-                                  sentences))
-    return s.replace('\r\n', ' ')
+    sentences = '<br>'.join('<br>'.join((sentence.en, sentence.ja))
+                            for sentence in self.sentences)
+    return super().anki_fields() + (self.characters,
+                                    ', '.join(self.readings),
+                                    ', '.join(self.parts_of_speech),
+                                    self.reading_mnemonic,
+                                    sentences)
 
   @staticmethod
   def anki_schema():
@@ -248,3 +304,16 @@ class Vocabulary(Subject):
             'Level: {}; ID: {}'
            ).format(self.characters, ', '.join(self.meanings),
                     ', '.join(self.readings), self.level, self.id)
+
+
+# Maps the "object" member of subject JSON to the class representing it.
+SUBJECT_CLASSES = {'radical': Radical, 'kanji': Kanji, 'vocabulary': Vocabulary}
+
+
+def create_subject(item, store_json=False):
+  """
+  @p item (dict) A subject JSON object retrieved through the WaniKani V2 API.
+  @p store_json (bool) If true, store @p item in the new instance.
+  @return A Radical, Kanji, or Vocabulary, according to @p item's type.
+  """
+  return SUBJECT_CLASSES[item['object']](item, store_json)
@@ -0,0 +1,66 @@
+#!/usr/bin/python3 -B
+"""
+Search subjects' meanings, mnemonics, and context sentences. Build an index
+from a saved catalog once with --catalog and --index, then query the index
+alone.
+"""
+
+import argparse
+import sys
+
+from interface.search import FIELD_NAMES, SearchIndex
+
+
+def handle_args():
+  """
+  @return the object returned by argparse.ArgumentParser.parse_args().
+  """
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--catalog', help=('build the index from a subject '
+                      'catalog saved by get_subjects.py --original-json or '
+                      '--ndjson'))
+  parser.add_argument('--index', help=('the index file: written when built '
+                      'with --catalog, and read otherwise'))
+  parser.add_argument('--field', help=('only match in this field; may be '
+                      'repeated'), choices=FIELD_NAMES, action='append')
+  parser.add_argument('--limit', help='the number of results to print',
+                      type=int, default=10)
+  parser.add_argument('--exact', help='do not tolerate typos in meanings',
+                      action='store_true')
+  parser.add_argument('query', help='English words and/or Japanese text',
+                      nargs='*')
+  args = parser.parse_args()
+  if not args.catalog and not args.index:
+    parser.error('one of --catalog or --index is required')
+  return args
+
+
+def main():
+  args = handle_args()
+
+  if args.catalog:
+    from interface.catalog import read_subject_json
+    from interface.subjects import create_subject
+    index = SearchIndex(create_subject(item)
+                        for item in read_subject_json(args.catalog))
+    if args.index:
+      index.save(args.index)
+  else:
+    index = SearchIndex.load(args.index)
+
+  if not args.query:
+    return
+
+  results = index.search(' '.join(args.query), args.limit, args.field,
+                         not args.exact)
+  if not results:
+    print('No subjects match.', file=sys.stderr)
+    sys.exit(1)
+  for result in results:
+    print('{:8.2f}  {:<10} {:<8} {} (ID {})'.format(
+      result.score, result.object, result.characters or '-', result.meaning,
+      result.id))
+
+
+if __name__ == "__main__":
+  main()
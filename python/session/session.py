@@ -5,14 +5,45 @@ transactions. This session is designed for the V2 API.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 from urllib.parse import urljoin
+from urllib3.util.retry import Retry
 
+from interface.instrument import timed_get, timed_json
 from session.user import User
 
 BASE_URL = 'https://api.wanikani.com/v2/'
 
+# Connections kept alive per host. This should be at least the number of
+# threads sharing one HTTP session, or connections are discarded and reopened.
+POOL_SIZE = 10
+
+# Transient server errors are retried with exponential backoff. 429s are not
+# retried here; the rate limiter in interface.ratelimit handles them.
+RETRIES = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+def create_http_session(pool_size=POOL_SIZE, retries=RETRIES):
+  """
+  @p pool_size (int) The number of keep-alive connections to pool per host.
+  @p retries (int) The number of times to retry transient failures.
+  @return (requests.Session) A session with a pooling, retrying adapter.
+  """
+  retry = Retry(total=retries, backoff_factor=RETRY_BACKOFF,
+                status_forcelist=RETRY_STATUSES, raise_on_status=False)
+  adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                        max_retries=retry)
+  http = requests.Session()
+  http.mount('https://', adapter)
+  http.mount('http://', adapter)
+  return http
+
+
 class Session:
-  def __init__(self, token, verbose=False):
+  def __init__(self, token, verbose=False, http=None, instrumentation=None,
+               base_url=BASE_URL):
     """
     Create a user session. This session uses the @p token to fetch user
     information via a REST transaction. If we can't determine user information
@@ -20,9 +51,22 @@ class Session:
 
     @p token A secret API token to use for this session.
     @p verbose If True, enable verbose logging.
+    @p http (requests.Session) The HTTP session to send requests through. It
+      carries no credentials, so one can be shared between Sessions for
+      different users. If None, one is created with create_http_session().
+    @p instrumentation (instrument.Instrumentation) If given, receives a
+      RequestRecord for the user request.
+    @p base_url (str) The base URL of the V2 API, e.g. a fixtures.server
+      stand-in.
     """
     self._token = token
     self._verbose = verbose
+    # TODO(orphen) Add explicit versioning when the V2 API graduates from beta.
+    # https://docs.api.wanikani.com/20170710/?shell#revisions-aka-versioning
+    self._headers = {'Authorization': 'Bearer {}'.format(token)}
+    self._http = http if http else create_http_session()
+    self._instrumentation = instrumentation
+    self._base_url = base_url
     self.user = None
 
     self._fetch_user()
@@ -30,14 +74,28 @@ class Session:
   def token(self):
     return self._token
 
+  def base_url(self):
+    return self._base_url
+
+  def headers(self):
+    """
+    @return (dict of str) The headers every request for this user must carry.
+    """
+    return self._headers
+
+  def http(self):
+    """
+    @return (requests.Session) The pooled HTTP session for this user's
+      requests.
+    """
+    return self._http
+
   def _fetch_user(self):
-    # TODO(orphen) Add explicit versioning when the V2 API graduates from beta.
-    # https://docs.api.wanikani.com/20170710/?shell#revisions-aka-versioning
-    headers = {'Authorization': 'Bearer {}'.format(self._token)}
-    user_data = requests.get(urljoin(BASE_URL, 'user'), headers=headers)
+    user_data, record = timed_get(self._http, urljoin(self._base_url, 'user'),
+                                  'user', headers=self._headers)
 
     if user_data.ok:
-      json = user_data.json()
+      json, record = timed_json(user_data, record)
       self.user = User(
         name=json['data']['username'],
         active=bool(json['data']['subscription']['active']),
@@ -48,6 +106,9 @@ class Session:
         print('Error fetching user data; reason: {}'.format(user_data.reason))
       self.user = None
 
+    if self._instrumentation is not None:
+      self._instrumentation.record(record)
+
   def __bool__(self):
     return self.user is not None
 
@@ -0,0 +1,44 @@
+"""
+Tests for interface.coverage. Run from python/ with
+  python3 -m unittest discover tests
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+from fixtures.catalog import synthetic_catalog
+from interface.coverage import CoverageIndex
+from interface.subjects import create_subject
+
+
+class ScanFileTest(unittest.TestCase):
+  @classmethod
+  def setUpClass(cls):
+    cls.index = CoverageIndex(create_subject(item) for item in
+                              synthetic_catalog(kanji=200, vocabulary=400))
+
+  def setUp(self):
+    rng = random.Random(0)
+    words = sorted(self.index._word_levels)
+    # One long line, so chunks have no line break to be cut at.
+    self.text = ''.join(rng.choice(words) + rng.choice(('', 'の', '、'))
+                        for _ in range(2000))
+    handle, self.path = tempfile.mkstemp()
+    with os.fdopen(handle, 'w', encoding='utf-8') as out:
+      out.write(self.text)
+
+  def tearDown(self):
+    os.remove(self.path)
+
+  def test_chunks_without_line_breaks(self):
+    expected = self.index.scan(self.text)
+    for chunk_size in (1, 2, 5, 64, 1000):
+      coverage = self.index.scan_file(self.path, chunk_size=chunk_size)
+      self.assertEqual(coverage.vocabulary, expected.vocabulary)
+      self.assertEqual(coverage.kanji, expected.kanji)
+
+
+if __name__ == '__main__':
+  unittest.main()
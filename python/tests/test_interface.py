@@ -0,0 +1,90 @@
+"""
+Tests for interface.interface against fixtures.server. Run from python/ with
+  python3 -m unittest discover tests
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from batch_sync import export_catalog
+from fixtures.catalog import synthetic_catalog
+from fixtures.server import StubServer
+from interface.cache import SubjectCache
+from interface.interface import IncompleteCollection, Interface
+from session.session import Session, create_http_session
+
+_CATALOG = synthetic_catalog(radicals=20, kanji=40, vocabulary=80)
+
+
+class _FailingServer(StubServer):
+  """
+  A stub that answers subjects requests matching @p fail_on with a 500.
+  """
+  def __init__(self, catalog, fail_on, **kwargs):
+    super().__init__(catalog, **kwargs)
+    self._fail_on = fail_on
+
+  def _handle(self, request):
+    if request.path.startswith('/v2/subjects') and \
+       self._fail_on in request.path:
+      return self._send(request, 500, self._error('Internal error', 500))
+    return super()._handle(request)
+
+
+class CachedSubjectsTest(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.cache = SubjectCache(os.path.join(self.directory, 'subjects.sqlite3'))
+
+  def tearDown(self):
+    self.cache.close()
+    shutil.rmtree(self.directory)
+
+  def interface(self, server):
+    # No retries, so failures are answered at once.
+    session = Session('token', http=create_http_session(retries=0),
+                      base_url=server.base_url)
+    return Interface(session, server.base_url)
+
+  def test_cache_path(self):
+    with StubServer(_CATALOG, per_page=50) as server:
+      subjects = self.interface(server).get_subjects(cache=self.cache)
+    self.assertEqual(sum(len(collection) for collection in subjects),
+                     len(_CATALOG))
+
+  def test_cache_levels(self):
+    with StubServer(_CATALOG, per_page=50) as server:
+      interface = self.interface(server)
+      top = [item['id'] for item in _CATALOG if item['data']['level'] == 60]
+      self.assertEqual([item['id'] for item in interface.iter_subject_json(
+        level=61, cache=self.cache)], top)
+    for level in (-1, 61):
+      with self.assertRaises(ValueError):
+        self.cache.items(level=level)
+
+  def test_cold_cache_failing_server(self):
+    with _FailingServer(_CATALOG, 'subjects', per_page=50) as server:
+      interface = self.interface(server)
+      self.assertIsNone(interface.get_subjects(cache=self.cache))
+      with self.assertRaises(IncompleteCollection):
+        list(interface.iter_subject_json(cache=self.cache))
+    self.assertEqual(len(self.cache), 0)
+
+  def test_cache_failing_page(self):
+    with _FailingServer(_CATALOG, 'page_after_id', per_page=50) as server:
+      self.assertIsNone(self.interface(server).get_subjects(cache=self.cache))
+    # The cache rolls back rather than keeping part of the catalog.
+    self.assertEqual(len(self.cache), 0)
+
+  def test_export_catalog_failing_server(self):
+    path = os.path.join(self.directory, 'subjects.ndjson')
+    with _FailingServer(_CATALOG, 'subjects', per_page=50) as server:
+      self.assertFalse(export_catalog(self.interface(server), path,
+                                      self.cache.path))
+    self.assertFalse(os.path.exists(path))
+
+
+if __name__ == '__main__':
+  unittest.main()
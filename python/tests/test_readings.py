@@ -0,0 +1,80 @@
+"""
+Tests for interface.readings. Run from python/ with
+  python3 -m unittest discover tests
+"""
+
+import unittest
+
+from fixtures.catalog import synthetic_catalog
+from interface.readings import ReadingIndex, romaji_to_hiragana, to_key
+from interface.subjects import create_subject
+
+
+def _vocabulary(readings):
+  """
+  @return (list) One Vocabulary per reading in @p readings, in order.
+  """
+  items = [item for item in synthetic_catalog(vocabulary=len(readings))
+           if item['object'] == 'vocabulary']
+  subjects = []
+  for item, reading in zip(items, readings):
+    item['data']['readings'] = [{'primary': True, 'reading': reading,
+                                 'accepted_answer': True}]
+    subjects.append(create_subject(item))
+  return subjects
+
+
+class ToKeyTest(unittest.TestCase):
+  def test_repeated_kana_are_kept(self):
+    for reading in ('ここ', 'ちち', 'はは', 'ささやか'):
+      self.assertEqual(to_key(reading), reading)
+
+  def test_repeated_katakana_become_hiragana(self):
+    self.assertEqual(to_key('ココ'), 'ここ')
+
+  def test_doubled_romaji_consonant_is_sokuon(self):
+    self.assertEqual(to_key('kko'), 'っこ')
+    self.assertEqual(to_key('kitte'), 'きって')
+    self.assertEqual(to_key('matcha'), 'まっちゃ')
+
+  def test_double_n_before_vowel(self):
+    self.assertEqual(to_key('onna'), 'おんな')
+    self.assertEqual(to_key('annai'), 'あんない')
+    self.assertEqual(to_key('minna'), 'みんな')
+    self.assertEqual(to_key('konnichiha'), 'こんにちは')
+    self.assertEqual(to_key('konnyaku'), 'こんにゃく')
+
+  def test_double_n_as_n(self):
+    self.assertEqual(to_key('nn'), 'ん')
+    self.assertEqual(to_key('shinnbun'), 'しんぶん')
+    self.assertEqual(to_key('onnna'), 'おんな')
+
+  def test_unfinished_syllable(self):
+    self.assertEqual(romaji_to_hiragana('kyoush'), ('きょう', 'sh'))
+
+
+class ReadingIndexTest(unittest.TestCase):
+  def setUp(self):
+    self.subjects = _vocabulary(
+      ['ここ', 'ちち', 'はは', 'こころ', 'おんな'])
+    self.index = ReadingIndex(self.subjects)
+    self.ids = {subject.readings[0]: subject.id for subject in self.subjects}
+
+  def test_lookup_repeated_kana(self):
+    for reading in ('ここ', 'ちち', 'はは'):
+      self.assertEqual(self.index.lookup(reading), [self.ids[reading]])
+    self.assertEqual(self.index.lookup('koko'), [self.ids['ここ']])
+    self.assertEqual(self.index.lookup('ココ'), [self.ids['ここ']])
+    self.assertEqual(self.index.lookup('onna'), [self.ids['おんな']])
+
+  def test_prefix_repeated_kana(self):
+    self.assertEqual(self.index.prefix('ここ'),
+                     sorted([self.ids['ここ'], self.ids['こころ']]))
+    self.assertEqual(self.index.prefix('こ'),
+                     sorted([self.ids['ここ'], self.ids['こころ']]))
+    self.assertEqual(self.index.completions('ち'), ['ちち'])
+    self.assertEqual(self.index.prefix('onn'), [self.ids['おんな']])
+
+
+if __name__ == '__main__':
+  unittest.main()
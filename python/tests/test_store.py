@@ -0,0 +1,45 @@
+"""
+Tests for interface.store. Run from python/ with
+  python3 -m unittest discover tests
+"""
+
+import unittest
+
+from fixtures.catalog import synthetic_catalog
+from interface.lazy import lazy_subjects
+from interface.store import SubjectStore
+from interface.subjects import create_subject
+
+_CATALOG = synthetic_catalog(radicals=20, kanji=40, vocabulary=80)
+
+
+class LazySubjectStoreTest(unittest.TestCase):
+  def setUp(self):
+    self.eager = SubjectStore(create_subject(item) for item in _CATALOG)
+    self.lazy = SubjectStore.from_subjects(lazy_subjects(_CATALOG))
+
+  def ids(self, subjects):
+    return sorted(subject.id for subject in subjects)
+
+  def test_types(self):
+    for name in ('radicals', 'kanji', 'vocabulary'):
+      self.assertEqual(self.ids(getattr(self.lazy, name)),
+                       self.ids(getattr(self.eager, name)))
+
+  def test_lookups(self):
+    kanji = self.eager.kanji[0]
+    reading = kanji.readings.onyomi[0]
+    self.assertEqual(self.ids(self.lazy.by_reading(reading)),
+                     self.ids(self.eager.by_reading(reading)))
+    self.assertEqual(self.ids(self.lazy.components(self.lazy.get(kanji.id))),
+                     self.ids(self.eager.components(kanji)))
+
+  def test_remove(self):
+    kanji = self.lazy.kanji[0]
+    self.lazy.remove(kanji.id)
+    self.assertNotIn(kanji.id, self.lazy)
+    self.assertEqual(len(self.lazy.kanji), len(self.eager.kanji) - 1)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/python3 -B
+"""
+Report how much of each Japanese text file is covered by WaniKani: the share of
+kanji occurrences known by each level, the level needed for a target share, the
+kanji WaniKani does not teach, and the WaniKani vocabulary found.
+"""
+
+import argparse
+
+from interface.catalog import read_subject_json
+from interface.coverage import CoverageIndex
+from interface.subjects import create_subject
+
+
+def handle_args():
+  """
+  @return the object returned by argparse.ArgumentParser.parse_args().
+  """
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument('--catalog', help=('a subject catalog saved by '
+                      'get_subjects.py --original-json or --ndjson'),
+                      required=True)
+  parser.add_argument('--target', help=('report the level at which this '
+                      'percentage of kanji is known'), type=float,
+                      action='append')
+  parser.add_argument('--top', help=('the number of unknown kanji and '
+                      'vocabulary to list'), type=int, default=10)
+  parser.add_argument('--encoding', help='the encoding of the text files',
+                      default='utf-8')
+  parser.add_argument('files', help='the text files to report on', nargs='+')
+  return parser.parse_args()
+
+
+def main():
+  args = handle_args()
+  targets = args.target if args.target else [50.0, 80.0, 90.0, 95.0, 98.0]
+
+  index = CoverageIndex(create_subject(item) for item in
+                        read_subject_json(args.catalog)
+                        if item['object'] in ('kanji', 'vocabulary'))
+
+  for path in args.files:
+    coverage = index.scan_file(path, encoding=args.encoding)
+    unknown = coverage.unknown_kanji()
+    print('{}: {} kanji occurrences ({} distinct), {} not in WaniKani'.format(
+      path, coverage.kanji_total(), len(coverage.kanji),
+      sum(unknown.values())))
+    for target in targets:
+      level = coverage.level_for(target / 100)
+      print('  {:g}% of kanji known at level {}'.format(
+        target, level if level else 'never'))
+    print('  Most common unknown kanji: {}'.format(' '.join(
+      '{}×{}'.format(kanji, count)
+      for kanji, count in unknown.most_common(args.top))))
+    print('  Most common vocabulary: {}'.format(' '.join(
+      '{}(L{})×{}'.format(word, index.word_level(word), count)
+      for word, count in coverage.vocabulary.most_common(args.top))))
+
+
+if __name__ == "__main__":
+  main()
@@ -4,6 +4,9 @@ Prints characters in Unicode ranges. By default, prints kanji from CJK ranges.
 """
 
 import argparse
+import os
+import sys
+import unicodedata
 from collections import namedtuple
 
 CodeRange = namedtuple('CodeRange', ['begin', 'end', 'name'])
@@ -11,6 +14,10 @@ CodeRange = namedtuple('CodeRange', ['begin', 'end', 'name'])
 DefaultRanges = [CodeRange(0x3400, 0x4db5, 'CJK unified ideographs Extension A - Rare Kanji'),
                  CodeRange(0x4e00, 0x9faf, 'CJK unified ideographs - Common and Uncommon Kanji')]
 
+# The number of codepoints covered by the assigned-codepoint index: the Basic and
+# Supplementary Multilingual and Ideographic Planes, which hold every kanji.
+INDEX_SIZE = 0x40000
+
 def prepare_ranges(ranges):
     """
     Builds a list of CodeRange instances from ranges specified on the command line.
@@ -26,33 +33,104 @@ def prepare_ranges(ranges):
 
     return code_ranges
 
-def print_ranges(glyphs_per_line, verbose, ranges):
+def assigned_index():
+    """
+    Returns a bytes bitmap where byte c is 1 if codepoint c is assigned in this Python's Unicode
+    database. The bitmap is built once per Unicode version and cached on disk, so filtering costs
+    one index per codepoint rather than a unicodedata call.
+    """
+    root = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    path = os.path.join(root, 'wktoolkit', 'assigned-{}.bin'.format(unicodedata.unidata_version))
+    try:
+        with open(path, 'rb') as cached:
+            index = cached.read()
+        if len(index) == INDEX_SIZE:
+            return index
+    except OSError:
+        pass
+
+    index = bytes(unicodedata.category(chr(code)) != 'Cn' for code in range(INDEX_SIZE))
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as cached:
+            cached.write(index)
+    except OSError:
+        pass  # Caching is an optimization only.
+    return index
+
+def catalog_characters(path):
+    """
+    Returns the set of single-character subjects in a catalog saved by get_subjects.py.
+    @p path (string) A file written with --original-json or --ndjson.
+    """
+    from interface.catalog import read_subject_json
+
+    characters = set()
+    for item in read_subject_json(path):
+        subject_characters = item['data'].get('characters')
+        if subject_characters and len(subject_characters) == 1:
+            characters.add(subject_characters)
+    return characters
+
+def render_range(code_range, glyphs_per_line, verbose, keep=None):
     """
+    Returns the text for one range as a single string.
+    @p code_range      (CodeRange)
     @p glyphs_per_line (int)
-    @p verbose         (bool) If True, print range titles and line-leading glyph codes.
-    @p ranges          (list of CodeRange instances)
+    @p verbose         (bool) If True, include the range title and line-leading glyph codes.
+    @p keep            (callable) If given, only codepoints for which keep(code) is true are shown.
     """
-    for code_range in ranges:
-        if verbose:
-            print('{} ({} - {})'.format(code_range.name, hex(code_range.begin), hex(code_range.end)))
+    codes = range(code_range.begin, code_range.end + 1)
+    if keep:
+        codes = [code for code in codes if keep(code)]
 
-        code = code_range.begin
-        count = 0
-        while code <= code_range.end:
-            if not count % glyphs_per_line and verbose:
-                print('{} '.format(hex(code)), end='')
+    lines = list()
+    if verbose:
+        lines.append('{} ({} - {})'.format(code_range.name, hex(code_range.begin), hex(code_range.end)))
 
-            print(chr(code), end='')
-            count += 1
+    for start in range(0, len(codes), glyphs_per_line):
+        row = codes[start:start + glyphs_per_line]
+        glyphs = ' '.join(map(chr, row))
+        lines.append('{} {}'.format(hex(row[0]), glyphs) if verbose else glyphs)
 
-            if count % glyphs_per_line:
-                print(' ', end='')
-            elif code != code_range.end:
-                print()
+    lines.append('')
+    return '\n'.join(lines)
 
-            code += 1
+def print_ranges(glyphs_per_line, verbose, ranges, keep=None, out=None):
+    """
+    @p glyphs_per_line (int)
+    @p verbose         (bool) If True, print range titles and line-leading glyph codes.
+    @p ranges          (list of CodeRange instances)
+    @p keep            (callable) If given, only codepoints for which keep(code) is true are printed.
+    @p out             (file) Where to write; stdout by default. Each range is one write.
+    """
+    out = out if out else sys.stdout
+    for code_range in ranges:
+        out.write(render_range(code_range, glyphs_per_line, verbose, keep))
 
-        print()
+def make_filter(assigned_only, catalog, in_catalog):
+    """
+    Combines the requested filters into one membership test, or returns None for no filtering.
+    @p assigned_only (bool) Keep only assigned codepoints.
+    @p catalog       (string) The path of a saved subject catalog, or None.
+    @p in_catalog    (bool) With @p catalog, keep glyphs in it if True and missing from it if False.
+    """
+    tests = list()
+    if assigned_only:
+        index = assigned_index()
+        tests.append(lambda code: code < INDEX_SIZE and index[code])
+    if catalog:
+        codes = frozenset(map(ord, catalog_characters(catalog)))
+        if in_catalog:
+            tests.append(codes.__contains__)
+        else:
+            tests.append(lambda code: code not in codes)
+
+    if not tests:
+        return None
+    if len(tests) == 1:
+        return tests[0]
+    return lambda code: all(test(code) for test in tests)
 
 
 def main():
@@ -63,9 +141,23 @@ def main():
                         action='store_true')
     parser.add_argument('--range', help='Specify a range as "hex_begin;hex_end;name"',
                         action='append')
+    parser.add_argument('--assigned', help='Print only codepoints assigned in the Unicode database',
+                        action='store_true')
+    parser.add_argument('--catalog', help=('A subject catalog saved by get_subjects.py '
+                        '--original-json or --ndjson, for --in-wanikani or --not-in-wanikani'))
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--in-wanikani', help='Print only glyphs that are WaniKani subjects',
+                       action='store_true')
+    group.add_argument('--not-in-wanikani', help='Print only glyphs that are not WaniKani subjects',
+                       action='store_true')
     args = parser.parse_args()
 
-    print_ranges(args.glyphs_per_line, args.verbose, prepare_ranges(args.range))
+    if (args.in_wanikani or args.not_in_wanikani) and not args.catalog:
+        parser.error('--in-wanikani and --not-in-wanikani require --catalog')
+
+    keep = make_filter(args.assigned, args.catalog if (args.in_wanikani or args.not_in_wanikani) else None,
+                       args.in_wanikani)
+    print_ranges(args.glyphs_per_line, args.verbose, prepare_ranges(args.range), keep)
 
 
 if __name__ == '__main__':